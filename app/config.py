@@ -20,6 +20,23 @@ class Config:
     # QA Loop Settings
     MAX_RETRIES = int(os.getenv("MAX_RETRIES", "4"))
 
+    # Number of images generated in parallel
+    MAX_IMAGE_CONCURRENCY = int(os.getenv("MAX_IMAGE_CONCURRENCY", "4"))
+
+    # Client-side cap on image generation requests per minute (0 = unlimited)
+    IMAGE_REQUESTS_PER_MINUTE = float(os.getenv("IMAGE_REQUESTS_PER_MINUTE", "0"))
+
+    # Number of text analysis requests (e.g. per-chunk scene splitting) sent in parallel
+    MAX_TEXT_CONCURRENCY = int(os.getenv("MAX_TEXT_CONCURRENCY", "4"))
+
+    # Characters of story text sent per scene-splitting request; larger chunks mean fewer round-trips
+    SCENE_CHUNK_SIZE = int(os.getenv("SCENE_CHUNK_SIZE", "50000"))
+
+    # Batch Mode Settings (scene highlight analysis)
+    HIGHLIGHT_BATCH_MODE = os.getenv("HIGHLIGHT_BATCH_MODE", "false").lower() == "true"
+    BATCH_POLL_INTERVAL = int(os.getenv("BATCH_POLL_INTERVAL", "10"))
+    BATCH_TIMEOUT = int(os.getenv("BATCH_TIMEOUT", "3600"))
+
     # Fallback to known working models if the preview ones are hypothetical for this environment
     # Note: Logic to switch can be added here if needed, but we stick to requirements.
 
@@ -2,4 +2,5 @@ from .ai_client import GenAIClient
 from .analyzer import StoryAnalyzer
 from .asset_manager import AssetManager
 from .illustrator import StoryIllustrator
+from .llm_cache import LLMCache
 from .models import Scene, Character, Location
@@ -1,33 +1,167 @@
-from google import genai
-from google.genai import types
 import logging
-from typing import List, Optional, Any, Dict
-from PIL import Image
+from typing import Callable, List, Optional, Any, Dict, Tuple, Union
 from app.config import Config
-import json
+import concurrent.futures
+import functools
+import importlib.util
+import io
+import mimetypes
 import os
+import re
+import sys
+import threading
+import time
+from pydantic import ValidationError
 from tenacity import retry, wait_exponential, stop_after_attempt
 from app.core.models import ImageValidationResult, HighlightResult
+from app.core.llm_cache import LLMCache
+from app.utils import json_utils
+from app.utils.rate_limiter import RateLimiter
 
 logger = logging.getLogger(__name__)
 
+
+def _lazy_import(name: str):
+    """Registers a module that is only executed on first attribute access."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    parent, _, child = name.rpartition(".")
+    if parent:
+        # Mirror the regular import system so `parent.child` resolves to the lazy module
+        setattr(sys.modules[parent], child, module)
+    loader.exec_module(module)
+    return module
+
+
+# The SDK and Pillow take a large share of startup time, so they load on first use
+genai = _lazy_import("google.genai")
+Image = _lazy_import("PIL.Image")
+
+# Anything that is not a letter, digit or underscore is dropped from filename slugs
+_SLUG_STRIP_RE = re.compile(r"\W+")
+
+# Extra attempts when a highlight response does not match the schema
+HIGHLIGHT_REPAIR_RETRIES = 2
+
+# Static highlight instructions, sent as the system instruction so the per-scene prompt only carries the scene itself
+_HIGHLIGHT_PREFIX = (
+    "Analyze the following scene text. This scene might cover a period of time with multiple actions.\n"
+    "To create a SINGLE cohesive illustration, identify the MOST visually striking, dramatic, or significant split-second moment.\n"
+    "Ignore everything that happens before or after this specific moment to avoid generated artifacts (like a character doing two things at once).\n\n"
+)
+_HIGHLIGHT_SUFFIX = (
+    "Return a JSON object with exactly these keys:\n"
+    "- \"highlight_description\": A brief explanation of the chosen moment.\n"
+    "- \"image_prompt\": A highly detailed visual description of THIS SPECIFIC MOMENT ONLY. "
+    "Describe the subjects, action, lighting, and camera angle. "
+    "Do NOT mention that it is a 'highlight' or 'moment', just describe the visual content.\n"
+    "- \"active_characters\": A list of strings containing ONLY the names of characters from the provided list that are in this moment."
+)
+_HIGHLIGHT_INSTRUCTIONS = _HIGHLIGHT_PREFIX + _HIGHLIGHT_SUFFIX
+
+# Terminal states of a Gemini batch job
+_BATCH_DONE_STATES = {
+    'JOB_STATE_SUCCEEDED', 'JOB_STATE_FAILED', 'JOB_STATE_CANCELLED',
+    'JOB_STATE_EXPIRED', 'JOB_STATE_PARTIALLY_SUCCEEDED'
+}
+# Process-wide SDK client so every GenAIClient shares one HTTP connection pool
+_CLIENT: Optional['genai.Client'] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def _get_client() -> 'genai.Client':
+    """Lazily creates the shared genai.Client."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = genai.Client(api_key=Config.GEMINI_API_KEY)
+        return _CLIENT
+
+
+@functools.lru_cache(maxsize=32)
+def _build_char_context(characters: Tuple[str, ...]) -> str:
+    """Character block of the highlight prompt; scenes with the same cast reuse the same string."""
+    return (
+        f"The following characters are present in the full scene: {', '.join(characters)}.\n"
+        "Identify EXACTLY which of these characters are visible in the specific highlight moment you chose. "
+        "Only list characters that are visually present in this split-second."
+    )
+
+
+def _read_image_part(path: str) -> 'genai.types.Part':
+    """
+    Wraps an image file's encoded bytes in a Part. Pillow only parses the header (to reject
+    non-images and pick the MIME type), and the SDK sends the bytes as-is instead of
+    re-encoding a decoded image on every request.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    with Image.open(io.BytesIO(data)) as image:
+        mime_type = Image.MIME.get(image.format, "image/jpeg")
+    return genai.types.Part.from_bytes(data=data, mime_type=mime_type)
+
+
+@functools.lru_cache(maxsize=64)
+def _load_ref_image(path: str, mtime: float) -> 'genai.types.Part':
+    """Reference image part, read once per (path, mtime) so references reused across scenes are not re-read from disk."""
+    return _read_image_part(path)
+
+
 class GenAIClient:
-    def __init__(self):
-        self.client = genai.Client(api_key=Config.GEMINI_API_KEY)
+    def __init__(self, cache: Optional[LLMCache] = None):
+        self.client = _get_client()
         self.text_model_name = Config.TEXT_MODEL_NAME
         self.image_model_name = Config.IMAGE_MODEL_NAME
+        # Optional persistent cache for deterministic text calls
+        self.cache = cache
+        # Paces image requests below the provider quota, so parallel workers don't trip 429 backoffs
+        self.image_rate_limiter = RateLimiter(Config.IMAGE_REQUESTS_PER_MINUTE, burst=Config.MAX_IMAGE_CONCURRENCY)
+
+    @staticmethod
+    def _safety_settings() -> List['genai.types.SafetySetting']:
+        return [
+            genai.types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="BLOCK_ONLY_HIGH"),
+            genai.types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="BLOCK_ONLY_HIGH"),
+            genai.types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="BLOCK_ONLY_HIGH"),
+            genai.types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="BLOCK_ONLY_HIGH")
+        ]
+
+    def _cache_key(self, namespace: str, *parts: Any) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return LLMCache.make_key(namespace, self.text_model_name, *parts)
+
+    def cached(self, namespace: str, parts: tuple, compute: Callable[[], Any],
+               encode: Optional[Callable[[Any], Any]] = None, decode: Optional[Callable[[Any], Any]] = None) -> Any:
+        """
+        Returns the cached result for (namespace, parts) or computes and stores it.
+        encode/decode convert results that are not plain JSON (e.g. Pydantic models) to and from storage.
+        """
+        key = self._cache_key(namespace, *parts)
+        if key is None:
+            return compute()
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            return decode(cached) if decode else cached
+
+        value = compute()
+        self.cache.set(key, encode(value) if encode else value)
+        return value
 
     @retry(wait=wait_exponential(multiplier=1, min=4, max=30), stop=stop_after_attempt(3), reraise=True)
-    def generate_text(self, prompt: str, schema: Optional[Any] = None) -> Any:
+    def generate_text(self, prompt: Union[str, List[str]], schema: Optional[Any] = None, system_instruction: Optional[str] = None) -> Any:
         try:
             config_args = {
-                'safety_settings': [
-                    types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="BLOCK_ONLY_HIGH"),
-                    types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="BLOCK_ONLY_HIGH"),
-                    types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="BLOCK_ONLY_HIGH"),
-                    types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="BLOCK_ONLY_HIGH")
-                ]
+                'safety_settings': self._safety_settings()
             }
+            if system_instruction:
+                config_args['system_instruction'] = system_instruction
             if schema:
                 config_args['response_mime_type'] = 'application/json'
                 config_args['response_schema'] = schema
@@ -35,7 +169,7 @@ class GenAIClient:
             response = self.client.models.generate_content(
                 model=self.text_model_name,
                 contents=prompt,
-                config=types.GenerateContentConfig(**config_args)
+                config=genai.types.GenerateContentConfig(**config_args)
             )
             
             if schema and hasattr(response, 'parsed') and response.parsed is not None:
@@ -48,9 +182,13 @@ class GenAIClient:
 
     def translate_to_english(self, text: str) -> str:
         """Translates text to English for folder naming."""
+        if text.isascii() and all(c.isalpha() or c.isspace() for c in text):
+            # Plain Latin-letter names are already usable as-is
+            return text.strip().replace(" ", "_")
+
         try:
             prompt = f"Translate the following name or phrase to English, providing only the translation, no extra text or punctuation: {text}"
-            return self.generate_text(prompt).strip().replace(" ", "_")
+            return self.cached("translate", (text,), lambda: self.generate_text(prompt).strip().replace(" ", "_"))
         except Exception as e:
             logger.warning(f"Translation failed for '{text}': {e}. Using original name.")
             return text
@@ -62,14 +200,16 @@ class GenAIClient:
                 f"Create a short, concise filename slug (max 4 words, snake_case) that summarizes this scene. "
                 f"Return ONLY the slug, no extension, no other text. Input: {text}"
             )
-            slug = self.generate_text(prompt).strip().lower()
-            # Basic sanitization
-            slug = "".join(x for x in slug if x.isalnum() or x == '_')
-            return slug
+            return self.cached("slug", (text,), lambda: self._sanitize_slug(self.generate_text(prompt)))
         except Exception as e:
             logger.warning(f"Slug generation failed: {e}. Using fallback.")
             return "scene"
 
+    @staticmethod
+    def _sanitize_slug(raw_slug: str) -> str:
+        # Basic sanitization
+        return _SLUG_STRIP_RE.sub("", raw_slug.strip().lower())
+
     def sanitize_prompt_feedback(self, feedback: str) -> str:
         """Translates QA validator feedback into a safe, positive image generation prompt."""
         try:
@@ -88,6 +228,32 @@ class GenAIClient:
             return feedback
 
 
+    def _build_highlight_prompt(self, scene_text: str, available_characters: List[str] = None) -> str:
+        char_context = _build_char_context(tuple(available_characters)) if available_characters else ""
+        return f"Scene Text: \"{scene_text}\"\n\n{char_context}"
+
+    def _parse_highlight_response(self, response_data: Any, available_characters: List[str] = None) -> Dict[str, Any]:
+        if isinstance(response_data, HighlightResult):
+            result = response_data
+        else:
+            # The SDK did not parse the response natively; validate the raw JSON against the schema
+            clean_text = json_utils.strip_code_fences(response_data)
+            result = HighlightResult.model_validate_json(clean_text)
+
+        data = result.model_dump()
+        if available_characters:
+            data["active_characters"] = [c for c in data["active_characters"] if c in available_characters]
+
+        return data
+
+    @staticmethod
+    def _highlight_fallback(scene_text: str, available_characters: List[str] = None) -> Dict[str, Any]:
+        return {
+            "highlight_description": "Fallback: Full scene context",
+            "image_prompt": scene_text,
+            "active_characters": available_characters or []
+        }
+
     def analyze_scene_for_highlight(self, scene_text: str, available_characters: List[str] = None) -> Dict[str, Any]:
         """
         Analyzes the scene text to identify the most visually striking and significant moment
@@ -104,54 +270,114 @@ class GenAIClient:
                 "active_characters": ["Char1", "Char2"] # Subset of available_characters present in the highlight
             }
         """
-        char_context = ""
-        if available_characters:
-            char_list_str = ", ".join(available_characters)
-            char_context = (
-                f"The following characters are present in the full scene: {char_list_str}.\n"
-                "Identify EXACTLY which of these characters are visible in the specific highlight moment you chose. "
-                "Only list characters that are visually present in this split-second."
-            )
-
         try:
-            prompt = (
-                "Analyze the following scene text. This scene might cover a period of time with multiple actions.\n"
-                "To create a SINGLE cohesive illustration, identify the MOST visually striking, dramatic, or significant split-second moment.\n"
-                "Ignore everything that happens before or after this specific moment to avoid generated artifacts (like a character doing two things at once).\n\n"
-                f"Scene Text: \"{scene_text}\"\n\n"
-                f"{char_context}\n\n"
-                "Return a JSON object with exactly these keys:\n"
-                "- \"highlight_description\": A brief explanation of the chosen moment.\n"
-                "- \"image_prompt\": A highly detailed visual description of THIS SPECIFIC MOMENT ONLY. "
-                "Describe the subjects, action, lighting, and camera angle. "
-                "Do NOT mention that it is a 'highlight' or 'moment', just describe the visual content.\n"
-                "- \"active_characters\": A list of strings containing ONLY the names of characters from the provided list that are in this moment."
+            prompt = self._build_highlight_prompt(scene_text, available_characters)
+            return self.cached(
+                "highlight",
+                (scene_text, sorted(available_characters or [])),
+                lambda: self._request_highlight(prompt, available_characters)
             )
             
-            response_data = self.generate_text(prompt, schema=HighlightResult)
-            
-            if isinstance(response_data, HighlightResult):
-                data = response_data.model_dump()
-            else:
-                # Fallback if string was returned
-                clean_text = response_data.replace("```json", "").replace("```", "").strip()
-                data = json.loads(clean_text)
-            
-            if available_characters and "active_characters" in data:
-                valid_chars = [c for c in data["active_characters"] if c in available_characters]
-                data["active_characters"] = valid_chars
-                
-            return data
-            
         except Exception as e:
             logger.error(f"Failed to analyze scene highlight: {e}")
-            return {
-                "highlight_description": "Fallback: Full scene context",
-                "image_prompt": scene_text,
-                "active_characters": available_characters or []
-            }
+            return self._highlight_fallback(scene_text, available_characters)
+
+    def _request_highlight(self, prompt: str, available_characters: List[str] = None) -> Dict[str, Any]:
+        """Requests a highlight, re-prompting with the validation errors if the response breaks the schema."""
+        current_prompt = prompt
+        for attempt in range(HIGHLIGHT_REPAIR_RETRIES + 1):
+            response_data = self.generate_text(current_prompt, schema=HighlightResult, system_instruction=_HIGHLIGHT_INSTRUCTIONS)
+            try:
+                return self._parse_highlight_response(response_data, available_characters)
+            except ValidationError as e:
+                if attempt == HIGHLIGHT_REPAIR_RETRIES:
+                    raise
+                errors = e.errors(include_url=False, include_input=False)
+                logger.warning(f"Highlight response failed validation (Attempt {attempt + 1}): {errors}")
+                current_prompt = (
+                    f"{prompt}\n\nPrevious response failed validation: {errors}. "
+                    "Return ONLY valid JSON matching the schema."
+                )
+
+    def analyze_scenes_batch(self, scenes: List[Tuple[str, List[str]]]) -> List[Dict[str, Any]]:
+        """
+        Runs the highlight analysis for many scenes as a single Gemini batch job
+        (inline requests) instead of one blocking request per scene.
+
+        Args:
+            scenes: List of (scene_text, available_characters) tuples.
+
+        Returns:
+            list: One highlight dict per scene, in input order. Items that fail in the
+            batch get the same fallback as analyze_scene_for_highlight.
+        """
+        if not scenes:
+            return []
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(scenes)
+        cache_keys = [self._cache_key("highlight", text, sorted(chars or [])) for text, chars in scenes]
+        if self.cache is not None:
+            for index, key in enumerate(cache_keys):
+                results[index] = self.cache.get(key)
+
+        missing = [index for index, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+
+        inline_requests = [
+            genai.types.InlinedRequest(
+                contents=self._build_highlight_prompt(*scenes[index]),
+                config=genai.types.GenerateContentConfig(
+                    safety_settings=self._safety_settings(),
+                    system_instruction=_HIGHLIGHT_INSTRUCTIONS,
+                    response_mime_type='application/json',
+                    response_schema=HighlightResult
+                )
+            )
+            for index in missing
+        ]
+
+        try:
+            logger.info(f"Submitting highlight batch job for {len(inline_requests)} scenes...")
+            batch_job = self.client.batches.create(
+                model=self.text_model_name,
+                src=inline_requests,
+                config={'display_name': 'scene-highlights'}
+            )
+
+            deadline = time.monotonic() + Config.BATCH_TIMEOUT
+            while batch_job.state.name not in _BATCH_DONE_STATES:
+                if time.monotonic() > deadline:
+                    self.client.batches.cancel(name=batch_job.name)
+                    raise TimeoutError(f"Batch job {batch_job.name} did not finish in {Config.BATCH_TIMEOUT}s")
+                time.sleep(Config.BATCH_POLL_INTERVAL)
+                batch_job = self.client.batches.get(name=batch_job.name)
+
+            if batch_job.state.name not in ('JOB_STATE_SUCCEEDED', 'JOB_STATE_PARTIALLY_SUCCEEDED'):
+                raise RuntimeError(f"Batch job {batch_job.name} finished with state {batch_job.state.name}")
+
+            inlined_responses = batch_job.dest.inlined_responses or []
+        except Exception as e:
+            logger.error(f"Highlight batch job failed: {e}. Falling back to per-scene analysis.")
+            for index in missing:
+                results[index] = self.analyze_scene_for_highlight(*scenes[index])
+            return results
+
+        for position, index in enumerate(missing):
+            scene_text, available_characters = scenes[index]
+            try:
+                inlined = inlined_responses[position]
+                if inlined.error:
+                    raise RuntimeError(inlined.error.message)
+                results[index] = self._parse_highlight_response(inlined.response.text, available_characters)
+                if self.cache is not None:
+                    self.cache.set(cache_keys[index], results[index])
+            except Exception as e:
+                logger.error(f"Failed to analyze scene highlight (batch item {index}): {e}")
+                results[index] = self._highlight_fallback(scene_text, available_characters)
+
+        return results
 
-    @retry(wait=wait_exponential(multiplier=1, min=4, max=30), stop=stop_after_attempt(3), reraise=True)
     def generate_image(self, prompt: str, reference_images: Optional[List[Dict[str, str]]] = None, output_path: str = None, aspect_ratio: str = None) -> str:
         """
         Generates an image using the configured model. 
@@ -172,6 +398,18 @@ class GenAIClient:
         if aspect_ratio is None:
             aspect_ratio = Config.IMAGE_ASPECT_RATIO
 
+        # Fail before the (expensive, retried) generation call if the result could not be saved
+        if not output_path:
+            raise ValueError("output_path is required to save the generated image.")
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        return self._generate_image(prompt, reference_images, output_path, aspect_ratio)
+
+    @retry(wait=wait_exponential(multiplier=1, min=4, max=30), stop=stop_after_attempt(3), reraise=True)
+    def _generate_image(self, prompt: str, reference_images: List[Dict[str, str]], output_path: str, aspect_ratio: str) -> str:
+        """Requests the image and saves it to output_path; transient failures are retried with backoff."""
         try:
             logger.info(f"Generating image with model {self.image_model_name}. Refs: {len(reference_images)}")
 
@@ -180,61 +418,55 @@ class GenAIClient:
             # 'generate_images' is for Imagen or older endpoints, but 'predict' 404s suggest mismatch.
             # We will switch to unified 'generate_content' for everything.
             
+            # The same file may be referenced for several purposes; upload it once and merge its instructions
+            refs_by_path: Dict[str, List[Dict[str, str]]] = {}
+            for ref in reference_images:
+                path = ref.get('path')
+                if path:
+                    refs_by_path.setdefault(os.path.abspath(path), []).append(ref)
+
             # Construct enhanced prompt with reference context
             final_prompt = prompt
-            if reference_images:
+            if refs_by_path:
                 final_prompt += "\n\nReference Images Context:"
-                for ref in reference_images:
-                    path = ref.get('path')
-                    if path:
-                        filename = os.path.basename(path)
-                        purpose = ref.get('purpose', 'Reference')
-                        usage = ref.get('usage', 'Use as visual reference.')
-                        final_prompt += f"\n- File: {filename}\n  Purpose: {purpose}\n  Instruction: {usage}"
+                for path, refs in refs_by_path.items():
+                    filename = os.path.basename(path)
+                    purpose = "; ".join(ref.get('purpose', 'Reference') for ref in refs)
+                    usage = " ".join(ref.get('usage', 'Use as visual reference.') for ref in refs)
+                    final_prompt += f"\n- File: {filename}\n  Purpose: {purpose}\n  Instruction: {usage}"
 
             contents = [final_prompt]
-            if reference_images:
-                for ref in reference_images:
-                    ref_path = ref.get('path')
-                    if ref_path and os.path.exists(ref_path):
-                            try:
-                                contents.append(Image.open(ref_path))
-                            except Exception as img_e:
-                                logger.warning(f"Could not load ref image {ref_path}: {img_e}")
+            contents.extend(self._load_reference_images([refs[0] for refs in refs_by_path.values()]))
 
             # Config for image generation
             # We must specify response_modalities=['IMAGE'] for image output (or TEXT, IMAGE)
             # Adding aspect_ratio to config
+            self.image_rate_limiter.acquire()
             response = self.client.models.generate_content(
                 model=self.image_model_name,
                 contents=contents,
-                config=types.GenerateContentConfig(
+                config=genai.types.GenerateContentConfig(
                     response_modalities=['IMAGE'],
-                    image_config=types.ImageConfig(
+                    image_config=genai.types.ImageConfig(
                         aspect_ratio=aspect_ratio,
                         image_size=Config.IMAGE_RESOLUTION
                     ),
-                    safety_settings=[
-                        types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="BLOCK_ONLY_HIGH"),
-                        types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="BLOCK_ONLY_HIGH"),
-                        types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="BLOCK_ONLY_HIGH"),
-                        types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="BLOCK_ONLY_HIGH")
-                    ]
+                    safety_settings=self._safety_settings()
                 )
             )
             
-            if response.parts:
-                for part in response.parts:
-                    if hasattr(part, 'image') and part.image:
-                         with open(output_path, "wb") as f:
-                            f.write(part.image.image_bytes)
-                         return output_path
-                    
-                    if hasattr(part, 'as_image'):
-                        pil_img = part.as_image()
-                        if pil_img:
-                            pil_img.save(output_path)
-                            return output_path
+            # Single pass over the parts; stop at the first image
+            for part in getattr(response, 'parts', None) or ():
+                image_bytes, mime_type = self._part_image_bytes(part)
+                if image_bytes:
+                    self._save_image_bytes(image_bytes, mime_type, output_path)
+                    return output_path
+                
+                if hasattr(part, 'as_image'):
+                    pil_img = part.as_image()
+                    if pil_img:
+                        pil_img.save(output_path)
+                        return output_path
 
             raise RuntimeError("Gemini generation returned no images.")
 
@@ -242,6 +474,57 @@ class GenAIClient:
             logger.error(f"Error generating image: {e}")
             raise
 
+    @staticmethod
+    def _load_reference_images(reference_images: List[Dict[str, str]]) -> List['genai.types.Part']:
+        """Loads reference images concurrently, keeping their order and skipping unreadable ones."""
+        def try_load(ref: Dict[str, str]) -> Optional['genai.types.Part']:
+            ref_path = ref.get('path')
+            if not ref_path or not os.path.exists(ref_path):
+                return None
+            try:
+                return _load_ref_image(ref_path, os.path.getmtime(ref_path))
+            except Exception as img_e:
+                logger.warning(f"Could not load ref image {ref_path}: {img_e}")
+                return None
+
+        if len(reference_images) < 2:
+            loaded = [try_load(ref) for ref in reference_images]
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, len(reference_images))) as executor:
+                loaded = list(executor.map(try_load, reference_images))
+        return [image for image in loaded if image is not None]
+
+    @staticmethod
+    def _part_image_bytes(part: Any) -> Tuple[Optional[bytes], Optional[str]]:
+        """Returns the encoded image bytes carried by a response part and their MIME type, if any."""
+        image = getattr(part, 'image', None)
+        if image and image.image_bytes:
+            return image.image_bytes, getattr(image, 'mime_type', None)
+
+        inline_data = getattr(part, 'inline_data', None)
+        data = getattr(inline_data, 'data', None)
+        if not isinstance(data, bytes):
+            return None, None
+        return data, getattr(inline_data, 'mime_type', None)
+
+    @staticmethod
+    def _save_image_bytes(data: bytes, mime_type: Optional[str], output_path: str):
+        """
+        Writes encoded image bytes to output_path. They are written as-is when they already are in the
+        format the extension asks for (or either type is unknown); otherwise they are transcoded with Pillow.
+        """
+        expected = mimetypes.guess_type(output_path)[0]
+        if not isinstance(mime_type, str) or expected is None or mime_type == expected:
+            with open(output_path, "wb") as f:
+                f.write(data)
+            return
+
+        with Image.open(io.BytesIO(data)) as image:
+            if expected == "image/jpeg" and image.mode not in ("RGB", "L"):
+                # JPEG has no alpha channel
+                image = image.convert("RGB")
+            image.save(output_path)
+
     def validate_image(self, generated_image_path: str, validation_rules: str, reference_images: Optional[List[Dict[str, str]]] = None) -> ImageValidationResult:
         logger.info(f"Running QA validation on {generated_image_path}...")
         
@@ -265,17 +548,15 @@ class GenAIClient:
                 prompt += f"\n- Reference Image {index + 1}:\n  Purpose: {purpose}\n  Instruction: {usage}"
 
         try:
-            contents = [prompt, Image.open(generated_image_path)]
+            contents = [prompt, _read_image_part(generated_image_path)]
             
             if reference_images:
-                for ref in reference_images:
-                    if ref.get('path') and os.path.exists(ref.get('path')):
-                        contents.append(Image.open(ref.get('path')))
+                contents.extend(self._load_reference_images(reference_images))
 
             result = self.client.models.generate_content(
                 model=Config.VALIDATOR_MODEL_NAME,
                 contents=contents,
-                config=types.GenerateContentConfig(
+                config=genai.types.GenerateContentConfig(
                     response_mime_type="application/json",
                     response_schema=ImageValidationResult,
                     temperature=0.0,
@@ -285,7 +566,7 @@ class GenAIClient:
                 return result.parsed
                 
             # Fallback if parsing didn't happen natively
-            data = json.loads(result.text)
+            data = json_utils.loads(result.text)
             return ImageValidationResult(**data)
             
         except Exception as e:
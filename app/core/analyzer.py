@@ -1,12 +1,71 @@
-import json
+import concurrent.futures
 import logging
-from typing import List
+from typing import Any, Callable, List, Optional, Tuple
 
+from pydantic import TypeAdapter
+
+from app.config import Config
 from app.core.ai_client import GenAIClient
-from app.core.models import Scene, Character, Location
+from app.core.models import Scene, Character, Location, SceneEntities
+from app.utils import json_utils
 
 logger = logging.getLogger(__name__)
 
+# Converters between analyzer results and the plain JSON kept in the response cache
+_SCENE_LIST = TypeAdapter(List[Scene])
+_ENTITIES = TypeAdapter(SceneEntities)
+
+# Static scene-splitting instructions, sent as the system instruction so every chunk's request shares the same prefix
+_SCENE_SPLIT_INSTRUCTIONS = (
+    "Analyze the following text and split it into logical Scenes.\n"
+    "A new scene starts when there is a change in:\n"
+    "1. Time (e.g., day to night, later that day)\n"
+    "2. Location (e.g., moving from indoors to outdoors)\n"
+    "3. Major Action (e.g., conversation ends, chase begins)\n\n"
+    "You are given a summary of the previous context (for reference only) and a new chunk of text.\n"
+    "Return a List of Scene objects based ONLY on the new chunk Text."
+)
+_SCENE_CONTEXT_PROMPT = "[PREVIOUS CONTEXT SUMMARY (For Reference Only)]\n{summary}\n\nText:"
+_CHUNK_SUMMARY_PROMPT = "Summarize the events and characters in this text chunk to context for the next split. Keep it under 150 words.\n\nText:"
+
+# Character and location instructions, sent together in one extract_entities request
+_CHARACTER_PROMPT = """Analyze the text and identify key characters.
+Create a **HIGHLY DETAILED** Visual Portrait for each.
+
+IMPORTANT RULES:
+- Populate the 'name' field with a clear English translation of the character's name.
+- Populate the 'original_name' field EXACTLY as the character is named in the original text language (e.g., in Russian).
+
+You must provide a comprehensive physical description including:
+- **Face**: Eye color/shape, nose, mouth, jawline, skin texture/tone, facial hair, makeup.
+- **Hair**: Exact color, style, length, texture.
+- **Physique**: Body type, height, posture, build.
+- **Outfit**: Detailed clothing breakdown (top, bottom, shoes, accessories), colors, materials, style (e.g., worn leather, silk robes).
+- **Distinctive Features**: Scars, tattoos, jewelry, glasses, weapons, props.
+
+The description must be vivid and specific enough for an artist to paint an exact replica without guessing. 
+If the text does not explicitly detail a character's physical appearance (e.g., "an old man"), you MUST invent a highly cohesive, culturally and contextually appropriate visual appearance for them. Do NOT skip a character just because the text lacks visual details!
+Avoid abstract personality traits (e.g., "kind", "brave") unless they manifest visually (e.g., "kind eyes", "confident stance").
+Focus ONLY on the character's physical visual traits. DO NOT describe their environment, background, or current situational action. The character must be described as if standing isolated in an empty white studio.
+"""
+_LOCATION_PROMPT = """Identify main locations.
+Provide detailed visual description (Architecture, Mood, Colors, Lighting).
+
+IMPORTANT RULES:
+- Populate the 'name' field with a clear English translation of the location.
+- Populate the 'original_name' field EXACTLY as the location is named in the original text language.
+"""
+_ENTITY_INSTRUCTIONS = (
+    "Analyze the text and fill in both lists.\n\n"
+    f"[CHARACTERS]\n{_CHARACTER_PROMPT}\n"
+    f"[LOCATIONS]\n{_LOCATION_PROMPT}"
+)
+
+def _require_response(response_data: Any, what: str) -> None:
+    """Raises on an empty or blocked reply, so it fails the request instead of being cached as 'nothing found'."""
+    if response_data is None or (isinstance(response_data, str) and not response_data.strip()):
+        raise ValueError(f"Model returned an empty response for {what}.")
+
 class StoryAnalyzer:
     def __init__(self, ai_client: GenAIClient):
         self.ai_client = ai_client
@@ -51,6 +110,13 @@ class StoryAnalyzer:
         """
         Acts as Art Director to extract system style prompt.
         """
+        return self.ai_client.cached(
+            "style", (text_segment[:5000], user_style_prompt),
+            lambda: self._generate_style(text_segment, user_style_prompt)
+        )
+
+    def _generate_style(self, text_segment: str, user_style_prompt: str) -> str:
+        """Generates a style description and repeats it until it passes the QA check (or retries run out)."""
         base_prompt = f"""
         Role: Art Director.
         Analyze the following text from a story and determine the most appropriate visual art style for illustrations.
@@ -104,9 +170,8 @@ class StoryAnalyzer:
             is_valid = True
             feedback = ""
             try:
-                clean_json = qa_response.replace("```json", "").replace("```", "").strip()
-                import json
-                qa_data = json.loads(clean_json)
+                clean_json = json_utils.strip_code_fences(qa_response)
+                qa_data = json_utils.loads(clean_json)
                 is_valid = qa_data.get("is_valid", True)
                 feedback = qa_data.get("feedback", "")
             except Exception as e:
@@ -128,129 +193,110 @@ class StoryAnalyzer:
         """
         Splits text into scenes using Semantic Chunking via Gemini.
         """
-        chunks = self.simple_text_splitter(text, chunk_size=50000, overlap=1000)
-
-        all_scenes = []
-        scene_counter = 1
-        running_context_summary = "Start of the story."
-
-        for chunk_idx, chunk in enumerate(chunks):
-            logger.info(f"Analyzing chunk {chunk_idx + 1}/{len(chunks)} for scenes...")
-            
-            prompt = f"""
-            Analyze the following text and split it into logical Scenes.
-            A new scene starts when there is a change in:
-            1. Time (e.g., day to night, later that day)
-            2. Location (e.g., moving from indoors to outdoors)
-            3. Major Action (e.g., conversation ends, chase begins)
+        chunks = self.simple_text_splitter(text, chunk_size=Config.SCENE_CHUNK_SIZE, overlap=1000)
 
-            [PREVIOUS CONTEXT SUMMARY (For Reference Only)]
-            {running_context_summary}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=Config.MAX_TEXT_CONCURRENCY) as executor:
+            # A context summary only depends on its own chunk, so all of them are requested at once
+            summaries = ["Start of the story."]
+            for summary in executor.map(self._summarize_chunk, chunks[:-1]):
+                # If a summary fails, the chunk keeps the previous context
+                summaries.append(summary if summary is not None else summaries[-1])
 
-            Return a List of Scene objects based ONLY on the new chunk Text below.
-            """
+            chunk_scenes = executor.map(
+                self._extract_chunk_scenes, range(len(chunks)), chunks, summaries, [len(chunks)] * len(chunks)
+            )
 
-            try:
-                response_data = self.ai_client.generate_text(prompt + f"\nText:\n{chunk}", schema=list[Scene])
-                
-                data_list = []
-                if isinstance(response_data, list):
-                    # Natively parsed by SDK via response.parsed
-                    data_list = [item.model_dump() if hasattr(item, 'model_dump') else item for item in response_data]
-                elif response_data:
-                    clean_text = response_data.replace("```json", "").replace("```", "").strip()
-                    data_list = json.loads(clean_text)
-                
-                if isinstance(data_list, list):
-                    sorted_data = sorted(data_list, key=lambda x: isinstance(x, dict) and x.get('start_index', 0) or getattr(x, 'start_index', 0))
-                    for s_data in sorted_data:
-                        if isinstance(s_data, dict):
-                            scene = Scene(**s_data)
-                        else:
-                            scene = s_data
-                        
-                        scene.id = scene_counter 
-                        scene_counter += 1
-                        all_scenes.append(scene)
-                else:
-                    logger.warning("Model returned non-list data for scenes.")
-                    
-            except Exception as e:
-                logger.error(f"Failed to extract scenes from chunk: {e}")
-            
-            if chunk_idx < len(chunks) - 1:
-                summary_prompt = f"Summarize the events and characters in this text chunk to context for the next split. Keep it under 150 words.\n\nText:\n{chunk[-5000:]}"
-                try:
-                    running_context_summary = self.ai_client.generate_text(summary_prompt)
-                except Exception as e:
-                    logger.warning(f"Failed to generate chunk context summary: {e}")
+            all_scenes = []
+            for scenes in chunk_scenes:
+                for scene in scenes:
+                    scene.id = len(all_scenes) + 1
+                    all_scenes.append(scene)
 
         return all_scenes
 
-    def extract_characters(self, text: str) -> List[Character]:
-        """
-        Extracts Character Sheets (Visual Descriptions).
-        """
-        prompt = f"""
-        Analyze the text and identify key characters.
-        Create a **HIGHLY DETAILED** Visual Portrait for each.
-        
-        IMPORTANT RULES:
-        - Populate the 'name' field with a clear English translation of the character's name.
-        - Populate the 'original_name' field EXACTLY as the character is named in the original text language (e.g., in Russian).
-        
-        You must provide a comprehensive physical description including:
-        - **Face**: Eye color/shape, nose, mouth, jawline, skin texture/tone, facial hair, makeup.
-        - **Hair**: Exact color, style, length, texture.
-        - **Physique**: Body type, height, posture, build.
-        - **Outfit**: Detailed clothing breakdown (top, bottom, shoes, accessories), colors, materials, style (e.g., worn leather, silk robes).
-        - **Distinctive Features**: Scars, tattoos, jewelry, glasses, weapons, props.
-        
-        The description must be vivid and specific enough for an artist to paint an exact replica without guessing. 
-        If the text does not explicitly detail a character's physical appearance (e.g., "an old man"), you MUST invent a highly cohesive, culturally and contextually appropriate visual appearance for them. Do NOT skip a character just because the text lacks visual details!
-        Avoid abstract personality traits (e.g., "kind", "brave") unless they manifest visually (e.g., "kind eyes", "confident stance").
-        Focus ONLY on the character's physical visual traits. DO NOT describe their environment, background, or current situational action. The character must be described as if standing isolated in an empty white studio.
-        """
+    def _summarize_chunk(self, chunk: str) -> Optional[str]:
+        """Summarizes the end of a chunk as context for splitting the next one."""
+        tail = chunk[-5000:]
+        try:
+            return self.ai_client.cached(
+                "chunk_summary", (tail,), lambda: self.ai_client.generate_text([_CHUNK_SUMMARY_PROMPT, tail])
+            )
+        except Exception as e:
+            logger.warning(f"Failed to generate chunk context summary: {e}")
+            return None
 
+    def _extract_chunk_scenes(self, chunk_idx: int, chunk: str, context_summary: str, total_chunks: int) -> List[Scene]:
+        """Splits one chunk into scenes, ordered by their position in the chunk."""
+        logger.info(f"Analyzing chunk {chunk_idx + 1}/{total_chunks} for scenes...")
         try:
-            response_data = self.ai_client.generate_text(prompt + f"\nText:\n{text}", schema=list[Character])
-            if isinstance(response_data, list):
-                return [ch if isinstance(ch, Character) else Character(**(ch.model_dump() if hasattr(ch, 'model_dump') else ch)) for ch in response_data]
-            
-            if not response_data:
-                 return []
-            
-            clean_text = response_data.replace("```json", "").replace("```", "").strip()
-            data = json.loads(clean_text)
-            return [Character(**d) for d in data]
+            return self._cached_models(
+                "scenes", (context_summary, chunk), _SCENE_LIST,
+                lambda: self._request_chunk_scenes(chunk, context_summary)
+            )
         except Exception as e:
-            logger.error(f"Error extracting characters: {e}")
+            logger.error(f"Failed to extract scenes from chunk: {e}")
             return []
 
-    def extract_locations(self, text: str) -> List[Location]:
+    def _request_chunk_scenes(self, chunk: str, context_summary: str) -> List[Scene]:
+        prompt = _SCENE_CONTEXT_PROMPT.format(summary=context_summary)
+        # The chunk goes out as its own part, so the ~50 KB text is never copied into the prompt string
+        response_data = self.ai_client.generate_text(
+            [prompt, chunk], schema=list[Scene], system_instruction=_SCENE_SPLIT_INSTRUCTIONS
+        )
+        _require_response(response_data, "scenes")
+
+        if isinstance(response_data, list):
+            # Natively parsed by SDK via response.parsed; those Scene objects are already validated
+            data_list = response_data
+        else:
+            clean_text = json_utils.strip_code_fences(response_data)
+            data_list = json_utils.loads(clean_text)
+
+        if not isinstance(data_list, list):
+            raise ValueError("Model returned non-list data for scenes.")
+
+        sorted_data = sorted(data_list, key=lambda x: isinstance(x, dict) and x.get('start_index', 0) or getattr(x, 'start_index', 0))
+        scenes = []
+        for s_data in sorted_data:
+            scene = Scene(**s_data) if isinstance(s_data, dict) else s_data
+            if not isinstance(scene, Scene):
+                raise TypeError(f"Unexpected scene item: {type(scene).__name__}")
+            scenes.append(scene)
+        return scenes
+
+    def _cached_models(self, namespace: str, parts: tuple, adapter: TypeAdapter, compute: Callable[[], Any]) -> Any:
+        """Runs compute through the client's response cache, storing its models as plain JSON data."""
+        return self.ai_client.cached(namespace, parts, compute, encode=adapter.dump_python, decode=adapter.validate_python)
+
+    def extract_characters(self, text: str) -> List[Character]:
         """
-        Extracts Location Concepts.
+        Extracts Character Sheets (Visual Descriptions); shares the request and cache entry of extract_entities.
         """
-        prompt = f"""
-        Identify main locations.
-        Provide detailed visual description (Architecture, Mood, Colors, Lighting).
-        
-        IMPORTANT RULES:
-        - Populate the 'name' field with a clear English translation of the location.
-        - Populate the 'original_name' field EXACTLY as the location is named in the original text language.
+        return self.extract_entities(text)[0]
+
+    def extract_locations(self, text: str) -> List[Location]:
+        """
+        Extracts Location Concepts; shares the request and cache entry of extract_entities.
         """
+        return self.extract_entities(text)[1]
 
+    def extract_entities(self, text: str) -> Tuple[List[Character], List[Location]]:
+        """
+        Extracts Character Sheets and Location Concepts in a single request.
+        """
         try:
-            response_data = self.ai_client.generate_text(prompt + f"\nText:\n{text}", schema=list[Location])
-            if isinstance(response_data, list):
-                return [loc if isinstance(loc, Location) else Location(**(loc.model_dump() if hasattr(loc, 'model_dump') else loc)) for loc in response_data]
-            
-            if not response_data:
-                 return []
-                 
-            clean_text = response_data.replace("```json", "").replace("```", "").strip()
-            data = json.loads(clean_text)
-            return [Location(**d) for d in data]
+            entities = self._cached_models("entities", (text,), _ENTITIES, lambda: self._request_entities(text))
+            return entities.characters, entities.locations
         except Exception as e:
-            logger.error(f"Error extracting locations: {e}")
-            return []
+            logger.error(f"Error extracting characters and locations: {e}")
+            return [], []
+
+    def _request_entities(self, text: str) -> SceneEntities:
+        response_data = self.ai_client.generate_text(
+            ["Text:", text], schema=SceneEntities, system_instruction=_ENTITY_INSTRUCTIONS
+        )
+        _require_response(response_data, "characters and locations")
+        if not isinstance(response_data, SceneEntities):
+            clean_text = json_utils.strip_code_fences(response_data)
+            response_data = SceneEntities.model_validate(json_utils.loads(clean_text))
+        return response_data
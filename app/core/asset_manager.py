@@ -1,21 +1,235 @@
+import concurrent.futures
+import functools
+import hashlib
 import os
-import json
+import re
 import logging
+import shutil
+import sys
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple, Union
 
 from app.config import Config
 from app.core.ai_client import GenAIClient
-from app.core.models import Character, Location, SemanticMatchResult
+from app.core.llm_cache import LLMCache
+from app.core.models import Character, Location, SemanticMatchResult, SemanticBatchResult
+from app.utils import json_utils
 
 logger = logging.getLogger(__name__)
 
+# data.json keys owned by the catalog; everything else is carried over unchanged on save
+_CATALOG_KEYS = ("characters", "character_aliases", "locations", "location_aliases", "semantic_cache")
+
+# Characters dropped from asset filenames (everything except letters, digits, '_', '-' and spaces)
+_SAFE_NAME_RE = re.compile(r"[^\w\- ]+")
+_TOKEN_RE = re.compile(r"\w+")
+
+# Lexical prefilter for semantic matching: only the closest candidates are sent to the AI,
+# near-identical entries with the same name match without a request and entries sharing
+# (almost) no content words never match. Extracted descriptions run to 20+ content words and
+# re-descriptions of one entity score well above 0.3; shorter entries are always left to the AI.
+SEMANTIC_SHORTLIST_SIZE = 5
+LEXICAL_MATCH_THRESHOLD = 0.9
+LEXICAL_REJECT_THRESHOLD = 0.1
+LEXICAL_MIN_WORDS = 12
+# Function words and the section headings of the extraction prompts, which every description shares
+_STOP_WORDS = frozenset(
+    "a an and are as at be been but by for from had has have he her hers him his i in into is it its of on onto "
+    "or our over she so than that the their them then there these they this those to under up was were which "
+    "while who whose with without you your "
+    "face hair physique outfit distinctive features architecture mood colors lighting".split()
+)
+
+
+# Asset prompt templates (filled with str.format; the Config values are passed in at call time)
+_CHARACTER_CARD_PROMPT = (
+    "Character design sheet of {name}, {description}. {style}. "
+    "Subject is isolated on a PURE WHITE background. Studio lighting. "
+    "Zero background elements, completely blank white background. "
+    "{aspect_ratio} aspect ratio. Single character only. No text, no labels, no frames, "
+    "no UI, no infographics. Exactly one depiction of the character."
+)
+_LOCATION_PROMPT = (
+    "Digital landscape art of {name}, {description}. "
+    "The visual style, lighting, and brushwork MUST be an exact match to the provided Environment Style Template. "
+    "{style}. {aspect_ratio} aspect ratio, cinematic wide shot. "
+    "Single view, no text, no labels, no split screen, no frames. "
+    "No people, no characters, no figures, no humans, no living beings. Empty scene, architecture and nature only. "
+    "High quality environment design. {digital_fix}"
+)
+# QA rules shared by the location style template and every location image
+_LOCATION_VALIDATION_RULES = """
+1. No Text Rule: The image MUST contain NO text, NO watermarks, NO speech bubbles, and NO UI elements.
+2. Empty Environment Rule: The image MUST NOT contain any characters, humans, or animals.
+3. No Frame Rule: The image MUST be a full-bleed picture extending edge-to-edge. It MUST NOT have any borders, frames, white margins, passe-partout, or split screens. If there is any visible frame or border around the image, it MUST fail.
+"""
+
+_SHINGLE_SIZE = 3
+
+
+def _shingles(text: str) -> set:
+    return {text[i:i + _SHINGLE_SIZE] for i in range(len(text) - _SHINGLE_SIZE + 1)}
+
+
+class _NameIndex(dict):
+    """
+    Name -> item registry that also keeps a lowercase index for O(1) case-insensitive lookups
+    and a 3-gram index that narrows the partial-name fallback to the names sharing a 3-gram with the query.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._lower: Dict[str, str] = {}
+        self._by_shingle: Dict[str, set] = {}
+        self._short_keys: set = set()
+        self._order: Dict[str, int] = {}
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, key: str, value):
+        # Names are repeated across scenes and indexes; interning keeps a single copy of each
+        key = sys.intern(key)
+        is_new = key not in self
+        super().__setitem__(key, value)
+        if is_new:
+            self._index(key)
+
+    def __delitem__(self, key: str):
+        super().__delitem__(key)
+        self._reindex()
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key: str, default=None):
+        # dict.setdefault would bypass __setitem__ and leave the new key out of the indexes
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def copy(self) -> "_NameIndex":
+        return _NameIndex(self)
+
+    def pop(self, key, *default):
+        value = super().pop(key, *default)
+        self._reindex()
+        return value
+
+    def clear(self):
+        super().clear()
+        self._reindex()
+
+    def _index(self, key: str):
+        self._lower.setdefault(key.lower(), key)
+        # Insertion position, so the fallback still returns the first match in dict order
+        self._order[key] = len(self._order)
+        if len(key) < _SHINGLE_SIZE:
+            self._short_keys.add(key)
+        for gram in _shingles(key):
+            self._by_shingle.setdefault(gram, set()).add(key)
+
+    def _reindex(self):
+        self._lower = {}
+        self._by_shingle = {}
+        self._short_keys = set()
+        self._order = {}
+        for key in self:
+            self._index(key)
+
+    def find(self, name: str):
+        """Exact name, then case-insensitive name, then the first entry whose name contains (or is contained in) the query."""
+        if name in self:
+            return self[name]
+
+        key = self._lower.get(name.lower())
+        if key is not None:
+            return self[key]
+
+        if len(name) < _SHINGLE_SIZE:
+            # Too short to narrow down by 3-grams
+            candidates = list(self)
+        else:
+            # Any name containing the query, or contained in it, shares at least one 3-gram with it
+            matched = set(self._short_keys)
+            for gram in _shingles(name):
+                matched.update(self._by_shingle.get(gram, ()))
+            candidates = sorted(matched, key=self._order.__getitem__)
+
+        for key in candidates:
+            if name in key or key in name:
+                return self[key]
+        return None
+
+
+def unique_items(items: Dict[str, Union[Character, Location]]) -> List[Union[Character, Location]]:
+    """Catalog entries without their aliases (names mapped to an already listed object)."""
+    return list({id(item): item for item in items.values()}.values())
+
+
+@functools.lru_cache(maxsize=1024)
+def _tokenize(name: str, description: str) -> frozenset:
+    return frozenset(_TOKEN_RE.findall(f"{name} {description}".lower())) - _STOP_WORDS
+
+
+def _normalize_name(name: str) -> str:
+    return " ".join(token for token in _TOKEN_RE.findall(name.lower()) if token not in _STOP_WORDS)
+
+
+def is_lexical_match(new_item: Union[Character, Location], score: float, candidate: Union[Character, Location]) -> bool:
+    """Near-identical descriptions only count as a match without the AI when the names agree as well."""
+    return score >= LEXICAL_MATCH_THRESHOLD and _normalize_name(new_item.name) == _normalize_name(candidate.name)
+
+
+def is_lexical_miss(new_item: Union[Character, Location], score: float) -> bool:
+    """A low overlap only rules out a match when the description is long enough for the score to mean something."""
+    return score < LEXICAL_REJECT_THRESHOLD and len(_tokenize(new_item.name, new_item.description)) >= LEXICAL_MIN_WORDS
+
+
+def lexical_shortlist(new_item: Union[Character, Location], candidates, size: int = SEMANTIC_SHORTLIST_SIZE) -> List[Tuple[float, Union[Character, Location]]]:
+    """Returns up to `size` (score, candidate) pairs ranked by Jaccard similarity of the content words of name and description."""
+    new_tokens = _tokenize(new_item.name, new_item.description)
+    scored = []
+    for candidate in candidates:
+        tokens = _tokenize(candidate.name, candidate.description)
+        union = len(new_tokens | tokens)
+        scored.append((len(new_tokens & tokens) / union if union else 0.0, candidate))
+    scored.sort(key=lambda pair: pair[0], reverse=True)
+    return scored[:size]
+
+
+def catalog_records(items: Dict[str, Union[Character, Location]]) -> Tuple[List[Dict], Dict[str, str]]:
+    """Serializes a catalog as one record per entity plus an {alias: catalog name} map."""
+    records = []
+    aliases = {}
+    names_by_item = {}
+    for name, item in items.items():
+        if id(item) in names_by_item:
+            aliases[name] = names_by_item[id(item)]
+            continue
+        names_by_item[id(item)] = name
+
+        record = {
+            "id": item.id,
+            "original_name": item.original_name or name,
+            "name": item.name,
+            "description": item.description,
+            "reference_image_path": item.reference_image_path
+        }
+        if isinstance(item, Character):
+            record["full_body_path"] = item.full_body_path
+        record["generation_prompt"] = item.generation_prompt
+        records.append(record)
+    return records, aliases
+
+
 class AssetManager:
     def __init__(self, ai_client: GenAIClient, output_dir: Path):
         self.ai_client = ai_client
         self.output_dir = output_dir
         self.char_dir = output_dir / "characters"
         self.loc_dir = output_dir / "locations"
+        # QA-passed asset images keyed by a hash of their prompt, reused when the same prompt comes up again
+        self.image_cache_dir = output_dir / ".image_cache"
         
         self.template_dir = output_dir / "style_templates"
         self.template_dir.mkdir(parents=True, exist_ok=True)
@@ -26,18 +240,45 @@ class AssetManager:
         }
 
         # In-memory registry to avoid re-generating in same run
-        self.characters: Dict[str, Character] = {}
-        self.locations: Dict[str, Location] = {}
+        self.characters: Dict[str, Character] = _NameIndex()
+        self.locations: Dict[str, Location] = _NameIndex()
         
         self.loc_templates = {
             "bg_landscape": self.template_dir / "bg_location.jpg"
         }
+        # String forms of the template paths, as passed to the AI client
+        self.template_strs = {k: str(v) for k, v in self.templates.items()}
+        self.loc_template_strs = {k: str(v) for k, v in self.loc_templates.items()}
         
         self.data_path = self.output_dir / "data.json"
+        # Set when the catalog has unsaved changes; written out by flush()
+        self._dirty = False
+        # Sanitized English filename stems per catalog name, so repeated names skip translation
+        self._safe_names: Dict[str, str] = {}
+        # Non-catalog fields of data.json (style, illustrations), kept so saves don't re-read the file
+        self._extra: Dict = {}
+        # AI semantic-match decisions (matched ID or None) keyed by item and candidate set, persisted in data.json
+        self._semantic_cache: Dict[str, Optional[int]] = {}
         
         # Load initial data
         self._load_data()
 
+    @property
+    def characters(self) -> Dict[str, Character]:
+        return self._characters
+
+    @characters.setter
+    def characters(self, value: Dict[str, Character]):
+        self._characters = value if isinstance(value, _NameIndex) else _NameIndex(value)
+
+    @property
+    def locations(self) -> Dict[str, Location]:
+        return self._locations
+
+    @locations.setter
+    def locations(self, value: Dict[str, Location]):
+        self._locations = value if isinstance(value, _NameIndex) else _NameIndex(value)
+
     def prepare_style_templates(self, detected_style: str):
         """Creates global character style templates once per run."""
         logger.info("Preparing global style templates...")
@@ -72,12 +313,12 @@ class AssetManager:
                     self.ai_client.generate_image(
                         current_prompt,
                         reference_images=[],
-                        output_path=str(self.templates["ref_f"]),
+                        output_path=self.template_strs["ref_f"],
                         aspect_ratio=Config.IMAGE_ASPECT_RATIO
                     )
                     
                     qa_result = self.ai_client.validate_image(
-                        generated_image_path=str(self.templates["ref_f"]),
+                        generated_image_path=self.template_strs["ref_f"],
                         validation_rules=validation_rules,
                         reference_images=[]
                     )
@@ -108,11 +349,7 @@ class AssetManager:
         )
         
         if not self.loc_templates["bg_landscape"].exists():
-            validation_rules = """
-            1. No Text Rule: The image MUST contain NO text, NO watermarks, NO speech bubbles, and NO UI elements.
-            2. Empty Environment Rule: The image MUST NOT contain any characters, humans, or animals.
-            3. No Frame Rule: The image MUST be a full-bleed picture extending edge-to-edge. It MUST NOT have any borders, frames, white margins, passe-partout, or split screens. If there is any visible frame or border around the image, it MUST fail.
-            """
+            validation_rules = _LOCATION_VALIDATION_RULES
             attempt = 1
             accumulated_feedbacks = []
             while attempt <= Config.MAX_RETRIES:
@@ -127,12 +364,12 @@ class AssetManager:
                 try:
                     self.ai_client.generate_image(
                         current_prompt,
-                        output_path=str(self.loc_templates["bg_landscape"]),
+                        output_path=self.loc_template_strs["bg_landscape"],
                         aspect_ratio=Config.IMAGE_ASPECT_RATIO
                     )
                     
                     qa_result = self.ai_client.validate_image(
-                        generated_image_path=str(self.loc_templates["bg_landscape"]),
+                        generated_image_path=self.loc_template_strs["bg_landscape"],
                         validation_rules=validation_rules,
                         reference_images=[]
                     )
@@ -155,35 +392,30 @@ class AssetManager:
         """Loads characters and locations from data.json if it exists."""
         if self.data_path.exists():
             try:
-                with open(self.data_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
+                data = json_utils.load_file(self.data_path)
+                self._extra = {k: v for k, v in data.items() if k not in _CATALOG_KEYS}
+                self._semantic_cache = dict(data.get('semantic_cache', {}))
+                
+                # Load Characters
+                chars_by_id = {}
+                for item in data.get('characters', []):
+                    char = Character.from_record(item)
+                    self._register_loaded(self.characters, chars_by_id, char)
+                    
+                # Load Locations
+                locs_by_id = {}
+                for item in data.get('locations', []):
+                    loc = Location.from_record(item)
+                    self._register_loaded(self.locations, locs_by_id, loc)
+
+                # Alternative names that were matched to an existing entity
+                for alias, name in data.get('character_aliases', {}).items():
+                    if name in self.characters and alias not in self.characters:
+                        self.characters[alias] = self.characters[name]
+                for alias, name in data.get('location_aliases', {}).items():
+                    if name in self.locations and alias not in self.locations:
+                        self.locations[alias] = self.locations[name]
                     
-                    # Load Characters
-                    for item in data.get('characters', []):
-                        char = Character(
-                            id=item.get('id'),
-                            name=item.get('name', item.get('original_name', 'Unknown')),
-                            description=item['description'],
-                            reference_image_path=item.get('reference_image_path'),
-
-                            full_body_path=item.get('full_body_path'),
-                            original_name=item.get('original_name'),
-                            generation_prompt=item.get('generation_prompt')
-                        )
-                        self.characters[char.name] = char
-                        
-                    # Load Locations
-                    for item in data.get('locations', []):
-                        loc = Location(
-                            id=item.get('id'),
-                            name=item.get('name', item.get('original_name', 'Unknown')),
-                            description=item['description'],
-                            reference_image_path=item.get('reference_image_path'),
-                            original_name=item.get('original_name'),
-                            generation_prompt=item.get('generation_prompt')
-                        )
-                        self.locations[loc.name] = loc
-                        
                 logger.info(f"Loaded {len(self.characters)} characters and {len(self.locations)} locations from data.json.")
             except Exception as e:
                 logger.error(f"Error loading data.json: {e}")
@@ -191,6 +423,21 @@ class AssetManager:
             # Fallback: Migrate legacy data if data.json doesn't exist
             self._migrate_legacy_data()
 
+    @staticmethod
+    def _register_loaded(index: Dict[str, Union[Character, Location]], by_id: Dict[int, Union[Character, Location]], item: Union[Character, Location]):
+        """
+        Adds a loaded record; older files store aliases as extra records sharing the entity's ID.
+        by_id maps the IDs loaded so far to their entity, so a load stays linear in the catalog size.
+        """
+        existing = by_id.get(item.id) if item.id is not None else None
+        if existing is not None:
+            if item.name not in index:
+                index[item.name] = existing
+            return
+        index[item.name] = item
+        if item.id is not None:
+            by_id[item.id] = item
+
     def _migrate_legacy_data(self):
         """One-time migration from legacy independent JSON files."""
         migrated = False
@@ -199,19 +446,10 @@ class AssetManager:
         legacy_char_path = self.char_dir / "characters.json"
         if legacy_char_path.exists():
             try:
-                with open(legacy_char_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    for item in data:
-                        char = Character(
-                            name=item.get('name', item.get('original_name', 'Unknown')),
-                            description=item['description'],
-                            reference_image_path=item.get('reference_image_path'),
-
-                            full_body_path=item.get('full_body_path'),
-                            original_name=item.get('original_name'),
-                            generation_prompt=item.get('generation_prompt')
-                        )
-                        self.characters[char.name] = char
+                data = json_utils.load_file(legacy_char_path)
+                for item in data:
+                    char = Character.from_record(item)
+                    self.characters[char.name] = char
                 migrated = True
                 logger.info(f"Migrated {len(self.characters)} characters from legacy storage.")
             except Exception as e:
@@ -221,17 +459,10 @@ class AssetManager:
         legacy_loc_path = self.loc_dir / "locations.json"
         if legacy_loc_path.exists():
             try:
-                with open(legacy_loc_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    for item in data:
-                        loc = Location(
-                            name=item.get('name', item.get('original_name', 'Unknown')),
-                            description=item['description'],
-                            reference_image_path=item.get('reference_image_path'),
-                            original_name=item.get('original_name'),
-                            generation_prompt=item.get('generation_prompt')
-                        )
-                        self.locations[loc.name] = loc
+                data = json_utils.load_file(legacy_loc_path)
+                for item in data:
+                    loc = Location.from_record(item)
+                    self.locations[loc.name] = loc
                 migrated = True
                 logger.info(f"Migrated {len(self.locations)} locations from legacy storage.")
             except Exception as e:
@@ -240,110 +471,157 @@ class AssetManager:
         if migrated:
             self._save_data()
 
+    def flush(self):
+        """Writes the catalog to data.json if it changed since the last save."""
+        if self._dirty:
+            self._save_data()
+            self._dirty = False
+
     def _save_data(self):
         """Saves current characters and locations to data.json, preserving other fields."""
-        current_data = {}
-        if self.data_path.exists():
-            try:
-                with open(self.data_path, "r", encoding="utf-8") as f:
-                    current_data = json.load(f)
-                    if not isinstance(current_data, dict):
-                        current_data = {}
-            except Exception:
-                pass
+        current_data = dict(self._extra)
         
         # Update Characters
-        char_list = []
-        for name, char in self.characters.items():
-            folder_name = Path(char.reference_image_path).parent.name if char.reference_image_path else "" 
-            # folder_name kept for legacy compatibility if needed, but not used in new flow
-            char_list.append({
-                "id": char.id,
-                "original_name": char.original_name or name,
-                "name": char.name,
-                "description": char.description,
-                "reference_image_path": char.reference_image_path,
-
-                "full_body_path": char.full_body_path,
-                "generation_prompt": char.generation_prompt
-            })
-        current_data['characters'] = char_list
+        current_data['characters'], current_data['character_aliases'] = catalog_records(self.characters)
         
         # Update Locations
-        loc_list = []
-        for name, loc in self.locations.items():
-            loc_list.append({
-                "id": loc.id,
-                "original_name": loc.original_name or name,
-                "name": loc.name,
-                "description": loc.description,
-                "reference_image_path": loc.reference_image_path,
-                "generation_prompt": loc.generation_prompt
-            })
-        current_data['locations'] = loc_list
+        current_data['locations'], current_data['location_aliases'] = catalog_records(self.locations)
+        current_data['semantic_cache'] = self._semantic_cache
         
         try:
-            with open(self.data_path, "w", encoding="utf-8") as f:
-                json.dump(current_data, f, ensure_ascii=False, indent=4)
+            json_utils.dump_file(current_data, self.data_path)
         except Exception as e:
              logger.error(f"Error saving data.json: {e}")
 
     def generate_character_assets(self, characters: List[Character], style_prompt: str):
+        # Already catalogued names (most scenes of a re-run) need no ID scan, AI call or save
+        if all(char.name in self.characters for char in characters):
+            for char in characters:
+                self._reuse_character_assets(char, self.characters[char.name])
+            return
+
         # Determine next ID
         existing_ids = [c.id for c in self.characters.values() if c.id is not None]
         next_id = max(existing_ids) + 1 if existing_ids else 1
 
+        try:
+            self._generate_character_assets(characters, style_prompt, next_id)
+        finally:
+            self.flush()
+
+    def _generate_character_assets(self, characters: List[Character], style_prompt: str, next_id: int):
+        # One AI request covers the semantic check of every character not in the catalog yet
+        semantic_matches = self._check_existing_semantic_batch(
+            [char for char in characters if char.name not in self.characters], self.characters, "character"
+        )
+
+        # Matching and ID assignment stay sequential; only the image generation runs concurrently
+        reused = []
+        pending = []
+        added = {}
         for char in characters:
             # 1. Check catalog first (exact match)
             if char.name in self.characters:
                 logger.info(f"Character {char.name} found in catalog. Using existing assets.")
                 existing_char = self.characters[char.name]
                 char.id = existing_char.id
-                char.full_body_path = existing_char.full_body_path
-                char.reference_image_path = existing_char.reference_image_path or existing_char.full_body_path
+                reused.append((char, existing_char))
                 continue
 
             # 2. Check catalog semantic match (AI check)
-            semantic_match = self._check_existing_character_semantic(char)
+            if char.name in semantic_matches:
+                semantic_match = semantic_matches[char.name]
+                if semantic_match is None and added:
+                    # The batch only saw the catalog from before this call; compare with the characters added since
+                    semantic_match = self._check_existing_character_semantic(char, added)
+            else:
+                semantic_match = self._check_existing_character_semantic(char)
             if semantic_match:
                 logger.info(f"Character {char.name} semantically matches existing {semantic_match.name}. Reusing assets.")
                 char.id = semantic_match.id
-                char.full_body_path = semantic_match.full_body_path
-                char.reference_image_path = semantic_match.reference_image_path or semantic_match.full_body_path
-                # We keep the new name for the story, but reuse the visual assets.
-                self.characters[char.name] = char # Map new name to existing assets object structure
+                reused.append((char, semantic_match))
+                # We keep the new name for the story as an alias of the existing entity
+                self.characters[char.name] = semantic_match
+                self._dirty = True
                 continue
 
             # Assign new ID
             char.id = next_id
             next_id += 1
 
-            # 3. Prepare filename: id_snake_case_name.jpeg
-            english_name = self.ai_client.translate_to_english(char.name)
-            safe_name = "".join(x for x in english_name if x.isalnum() or x in (' ', '_', '-')).strip().replace(' ', '_').lower()
-            filename = f"{char.id}_{safe_name}.jpeg"
-            
+            # 3. Register now so repeats later in the list reuse it; the card is generated below
+            self.characters[char.name] = char
+            added[char.name] = char
+            self._dirty = True
+            pending.append(char)
+
+        # 4. Generate Cards (one directory listing instead of a stat per card)
+        if pending:
             # Ensure output directory exists (no subfolders)
             self.char_dir.mkdir(parents=True, exist_ok=True)
-            output_file = self.char_dir / filename
-
-            # 4. Generate Cards
-            # Generate Full Body directly to final path
-            if self._generate_single_card(char, style_prompt, output_file):
-                # Set legacy reference path to full body as default
-                char.full_body_path = str(output_file)
-                char.reference_image_path = char.full_body_path
-                char.original_name = char.name
-            
-            # 5. Update Data
-            self.characters[char.name] = char
-            self._save_data()
+            existing_files = set(os.listdir(self.char_dir))
+            self._run_concurrently([
+                functools.partial(self._generate_character_card, char, style_prompt, existing_files)
+                for char in pending
+            ])
+
+        # 5. Reused characters pick up the asset paths (including ones generated just now)
+        for char, existing_char in reused:
+            self._reuse_character_assets(char, existing_char)
+
+    @staticmethod
+    def _reuse_character_assets(char: Character, existing_char: Character):
+        char.id = existing_char.id
+        char.full_body_path = existing_char.full_body_path
+        char.reference_image_path = existing_char.reference_image_path or existing_char.full_body_path
+
+    def _generate_character_card(self, char: Character, style_prompt: str, existing_files: Optional[set] = None):
+        # Filename: id_snake_case_name.jpeg (the name translation runs in the worker too)
+        output_file = self.char_dir / f"{char.id}_{self._safe_name(char.name)}.jpeg"
+
+        # Generate Full Body directly to final path
+        if self._generate_single_card(char, style_prompt, output_file, existing_files):
+            # Set legacy reference path to full body as default
+            char.reference_image_path = char.full_body_path
+            char.original_name = char.name
+
+    @staticmethod
+    def _run_concurrently(tasks: List[Callable[[], None]]):
+        """
+        Runs independent image-generation tasks on a bounded thread pool.
+        A failing task is logged and skipped, however many tasks are in the batch.
+        """
+        if len(tasks) < 2:
+            for task in tasks:
+                try:
+                    task()
+                except Exception as e:
+                    logger.error(f"Asset generation failed: {e}")
+            return
 
-    def _generate_single_card(self, char: Character, style_prompt: str, output_file: Path) -> bool:
-        style_ref = self.templates["ref_f"]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=Config.MAX_IMAGE_CONCURRENCY) as executor:
+            futures = [executor.submit(task) for task in tasks]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"Asset generation failed: {e}")
+
+    def _safe_name(self, name: str) -> str:
+        """Translated, filesystem-safe snake_case stem for an asset filename."""
+        if name not in self._safe_names:
+            english_name = self.ai_client.translate_to_english(name)
+            self._safe_names[name] = _SAFE_NAME_RE.sub("", english_name).strip().replace(' ', '_').lower()
+        return self._safe_names[name]
+
+    def _generate_single_card(self, char: Character, style_prompt: str, output_file: Path, existing_files: Optional[set] = None) -> bool:
+        """Generates a character card; existing_files is an optional listing of the target directory."""
+        style_ref = self.template_strs["ref_f"]
+        output_path = str(output_file)
         
-        if output_file.exists():
-            char.full_body_path = str(output_file)
+        already_exists = output_file.exists() if existing_files is None else output_file.name in existing_files
+        if already_exists:
+            char.full_body_path = output_path
             return True
 
         digital_fix = Config.DIGITAL_FIX
@@ -356,14 +634,17 @@ class AssetManager:
         """
 
         # IMPLEMENTED: Strict requirement for pure white background for concept isolation
-        base_prompt = (
-            f"Character design sheet of {char.name}, {char.description}. {style_prompt}. "
-            f"Subject is isolated on a PURE WHITE background. Studio lighting. "
-            f"Zero background elements, completely blank white background. "
-            f"{Config.IMAGE_ASPECT_RATIO} aspect ratio. Single character only. No text, no labels, no frames, "
-            f"no UI, no infographics. Exactly one depiction of the character."
+        base_prompt = _CHARACTER_CARD_PROMPT.format(
+            name=char.name, description=char.description, style=style_prompt, aspect_ratio=Config.IMAGE_ASPECT_RATIO
         )
 
+        cache_file = self._image_cache_file(base_prompt + f"\n{digital_fix}", style_ref)
+        if self._restore_cached_image(cache_file, output_path):
+            logger.info(f"Reusing cached image for {char.name}.")
+            char.full_body_path = output_path
+            char.generation_prompt = self._cached_image_prompt(cache_file, base_prompt + f"\n{digital_fix}")
+            return True
+
         attempt = 1
         accumulated_feedbacks = []
 
@@ -381,23 +662,24 @@ class AssetManager:
                 self.ai_client.generate_image(
                     prompt=current_prompt,
                     reference_images=[{
-                        "path": str(style_ref),
+                        "path": style_ref,
                         "purpose": "Character Style Reference",
                         "usage": "Adopt the art style, line quality, and coloring."
                     }],
-                    output_path=str(output_file),
+                    output_path=output_path,
                     aspect_ratio=Config.IMAGE_ASPECT_RATIO
                 )
                 
                 qa_result = self.ai_client.validate_image(
-                    generated_image_path=str(output_file),
+                    generated_image_path=output_path,
                     validation_rules=validation_rules,
                     reference_images=[]
                 )
                 
                 if qa_result.is_valid:
                     logger.info(f"✅ Character {char.name} passed QA validation!")
-                    char.full_body_path = str(output_file)
+                    self._store_cached_image(output_path, cache_file, current_prompt)
+                    char.full_body_path = output_path
                     char.generation_prompt = current_prompt
                     return True
                 else:
@@ -411,143 +693,315 @@ class AssetManager:
 
         logger.warning(f"⚠️ Max retries reached or failed to generate Character {char.name}.")
         if output_file.exists():
-            char.full_body_path = str(output_file)
+            char.full_body_path = output_path
             char.generation_prompt = current_prompt
             return True
         
         return False
 
     def generate_location_assets(self, locations: List[Location], style_prompt: str):
+        # Already catalogued locations need no ID scan, AI call or save
+        existing = [self.get_location_data(loc.name) for loc in locations]
+        if all(existing):
+            for loc, existing_loc in zip(locations, existing):
+                self._reuse_location_assets(loc, existing_loc)
+            return
+
         # Determine next ID
         existing_ids = [l.id for l in self.locations.values() if l.id is not None]
         next_id = max(existing_ids) + 1 if existing_ids else 1
 
+        try:
+            self._generate_location_assets(locations, style_prompt, next_id)
+        finally:
+            self.flush()
+
+    def _generate_location_assets(self, locations: List[Location], style_prompt: str, next_id: int):
+        # One AI request covers the semantic check of every location not in the catalog yet
+        semantic_matches = self._check_existing_semantic_batch(
+            [loc for loc in locations if not self.get_location_data(loc.name)], self.locations, "location"
+        )
+
+        # Matching and ID assignment stay sequential; only the image generation runs concurrently
+        reused = []
+        pending = []
+        added = {}
         for loc in locations:
             # 1. Check catalog first (exact match)
             existing_loc = self.get_location_data(loc.name)
             if existing_loc:
                 logger.info(f"Location {loc.name} matches existing {existing_loc.name}. Reusing assets.")
                 loc.id = existing_loc.id
-                loc.reference_image_path = existing_loc.reference_image_path
-                loc.generation_prompt = existing_loc.generation_prompt
+                reused.append((loc, existing_loc))
                 continue
 
             # 2. Check catalog semantic match (AI check)
-            semantic_match = self._check_existing_location_semantic(loc)
+            if loc.name in semantic_matches:
+                semantic_match = semantic_matches[loc.name]
+                if semantic_match is None and added:
+                    # The batch only saw the catalog from before this call; compare with the locations added since
+                    semantic_match = self._check_existing_location_semantic(loc, added)
+            else:
+                semantic_match = self._check_existing_location_semantic(loc)
             if semantic_match:
                 logger.info(f"Location {loc.name} semantically matches existing {semantic_match.name}. Reusing assets.")
                 loc.id = semantic_match.id
-                loc.reference_image_path = semantic_match.reference_image_path
-                loc.generation_prompt = semantic_match.generation_prompt
-                self.locations[loc.name] = loc 
+                reused.append((loc, semantic_match))
+                self.locations[loc.name] = semantic_match
+                self._dirty = True
                 continue
 
             # Assign new ID
             loc.id = next_id
             next_id += 1
 
-            # Translate name for filename
-            english_name = self.ai_client.translate_to_english(loc.name)
-            safe_name = "".join(x for x in english_name if x.isalnum() or x in (' ', '_', '-')).strip().replace(' ', '_').lower()
-            filename = f"{loc.id}_{safe_name}.jpeg"
-            
+            # Register now so repeats later in the list reuse it; the image is generated below
+            self.locations[loc.name] = loc
+            added[loc.name] = loc
+            self._dirty = True
+            pending.append(loc)
+
+        if pending:
             self.loc_dir.mkdir(parents=True, exist_ok=True)
-            img_file = self.loc_dir / filename
-            
-            # Base Prompt
-            digital_fix = Config.DIGITAL_FIX
-            base_prompt = (
-                f"Digital landscape art of {loc.name}, {loc.description}. "
-                f"The visual style, lighting, and brushwork MUST be an exact match to the provided Environment Style Template. "
-                f"{style_prompt}. {Config.IMAGE_ASPECT_RATIO} aspect ratio, cinematic wide shot. "
-                f"Single view, no text, no labels, no split screen, no frames. "
-                f"No people, no characters, no figures, no humans, no living beings. Empty scene, architecture and nature only. "
-                f"High quality environment design. {digital_fix}"
-            )
+            self._run_concurrently([
+                functools.partial(self._generate_location_card, loc, style_prompt)
+                for loc in pending
+            ])
 
-            validation_rules = """
-            1. No Text Rule: The image MUST contain NO text, NO watermarks, NO speech bubbles, and NO UI elements.
-            2. Empty Environment Rule: The image MUST NOT contain any characters, humans, or animals.
-            3. No Frame Rule: The image MUST be a full-bleed picture extending edge-to-edge. It MUST NOT have any borders, frames, white margins, passe-partout, or split screens. If there is any visible frame or border around the image, it MUST fail.
-            """
+        # Reused locations pick up the asset paths (including ones generated just now)
+        for loc, existing_loc in reused:
+            self._reuse_location_assets(loc, existing_loc)
 
-            attempt = 1
-            accumulated_feedbacks = []
+    @staticmethod
+    def _reuse_location_assets(loc: Location, existing_loc: Location):
+        loc.id = existing_loc.id
+        loc.reference_image_path = existing_loc.reference_image_path
+        loc.generation_prompt = existing_loc.generation_prompt
 
-            while attempt <= Config.MAX_RETRIES:
-                logger.info(f"Generating location {loc.name} (Attempt {attempt}/{Config.MAX_RETRIES})...")
-                
-                current_prompt = base_prompt
-                if accumulated_feedbacks:
-                    current_prompt += "\n\n[CRITICAL CORRECTIONS REQUIRED]\nYou previously made errors. You MUST apply ALL of the following corrections:\n"
-                    for i, fb in enumerate(accumulated_feedbacks, 1):
-                        current_prompt += f"{i}. {fb}\n"
-                    current_prompt += "\nDO NOT change the art style from the reference image."
+    def _generate_location_card(self, loc: Location, style_prompt: str):
+        # Translate name for filename (in the worker, alongside the image generation)
+        img_file = self.loc_dir / f"{loc.id}_{self._safe_name(loc.name)}.jpeg"
+        output_path = str(img_file)
 
-                try:
-                    self.ai_client.generate_image(
-                        prompt=current_prompt,
-                        reference_images=[{
-                            "path": str(self.loc_templates["bg_landscape"]),
-                            "purpose": "Environment Style Template",
-                            "usage": "This image is the absolute source of truth for visual style, color palette, and artistic technique. The new image MUST be an identical stylistic match to this reference."
-                        }],
-                        output_path=str(img_file),
-                        aspect_ratio=Config.IMAGE_ASPECT_RATIO
-                    )
-                    
-                    qa_result = self.ai_client.validate_image(
-                        generated_image_path=str(img_file),
-                        validation_rules=validation_rules,
-                        reference_images=[]
-                    )
-                    
-                    if qa_result.is_valid:
-                        logger.info(f"✅ Location {loc.name} passed QA validation!")
-                        loc.reference_image_path = str(img_file)
-                        loc.generation_prompt = current_prompt
-                        if not loc.original_name:
-                            loc.original_name = loc.name
-                        
-                        self.locations[loc.name] = loc
-                        self._save_data()
-                        break
-                    else:
-                        logger.warning(f"❌ Location {loc.name} validation failed: {qa_result.feedback}")
-                        safe_feedback = self.ai_client.sanitize_prompt_feedback(qa_result.feedback)
-                        accumulated_feedbacks.append(safe_feedback)
-                        attempt += 1
-                        
-                except Exception as e:
-                    logger.error(f"Error generating location {loc.name}: {e}")
-                    attempt += 1
+        # Base Prompt
+        digital_fix = Config.DIGITAL_FIX
+        base_prompt = _LOCATION_PROMPT.format(
+            name=loc.name, description=loc.description, style=style_prompt,
+            aspect_ratio=Config.IMAGE_ASPECT_RATIO, digital_fix=digital_fix
+        )
 
-            if attempt > Config.MAX_RETRIES:
-                logger.warning(f"⚠️ Max retries reached for Location {loc.name}. Proceeding with the last generated image.")
-                if img_file.exists():
-                    loc.reference_image_path = str(img_file)
-                    loc.generation_prompt = current_prompt
-                if not loc.original_name:
-                    loc.original_name = loc.name
+        validation_rules = _LOCATION_VALIDATION_RULES
+
+        cache_file = self._image_cache_file(base_prompt, self.loc_template_strs["bg_landscape"])
+        if self._restore_cached_image(cache_file, output_path):
+            logger.info(f"Reusing cached image for location {loc.name}.")
+            loc.reference_image_path = output_path
+            loc.generation_prompt = self._cached_image_prompt(cache_file, base_prompt)
+            if not loc.original_name:
+                loc.original_name = loc.name
+            return
+
+        attempt = 1
+        accumulated_feedbacks = []
+
+        while attempt <= Config.MAX_RETRIES:
+            logger.info(f"Generating location {loc.name} (Attempt {attempt}/{Config.MAX_RETRIES})...")
+            
+            current_prompt = base_prompt
+            if accumulated_feedbacks:
+                current_prompt += "\n\n[CRITICAL CORRECTIONS REQUIRED]\nYou previously made errors. You MUST apply ALL of the following corrections:\n"
+                for i, fb in enumerate(accumulated_feedbacks, 1):
+                    current_prompt += f"{i}. {fb}\n"
+                current_prompt += "\nDO NOT change the art style from the reference image."
+
+            try:
+                self.ai_client.generate_image(
+                    prompt=current_prompt,
+                    reference_images=[{
+                        "path": self.loc_template_strs["bg_landscape"],
+                        "purpose": "Environment Style Template",
+                        "usage": "This image is the absolute source of truth for visual style, color palette, and artistic technique. The new image MUST be an identical stylistic match to this reference."
+                    }],
+                    output_path=output_path,
+                    aspect_ratio=Config.IMAGE_ASPECT_RATIO
+                )
                 
-                self.locations[loc.name] = loc
-                self._save_data()
+                qa_result = self.ai_client.validate_image(
+                    generated_image_path=output_path,
+                    validation_rules=validation_rules,
+                    reference_images=[]
+                )
+                
+                if qa_result.is_valid:
+                    logger.info(f"✅ Location {loc.name} passed QA validation!")
+                    self._store_cached_image(output_path, cache_file, current_prompt)
+                    loc.reference_image_path = output_path
+                    loc.generation_prompt = current_prompt
+                    if not loc.original_name:
+                        loc.original_name = loc.name
+                    break
+                else:
+                    logger.warning(f"❌ Location {loc.name} validation failed: {qa_result.feedback}")
+                    safe_feedback = self.ai_client.sanitize_prompt_feedback(qa_result.feedback)
+                    accumulated_feedbacks.append(safe_feedback)
+                    attempt += 1
+                    
+            except Exception as e:
+                logger.error(f"Error generating location {loc.name}: {e}")
+                attempt += 1
+
+        if attempt > Config.MAX_RETRIES:
+            logger.warning(f"⚠️ Max retries reached for Location {loc.name}. Proceeding with the last generated image.")
+            if img_file.exists():
+                loc.reference_image_path = output_path
+                loc.generation_prompt = current_prompt
+            if not loc.original_name:
+                loc.original_name = loc.name
+
+    def _image_cache_file(self, prompt: str, style_ref: str) -> Path:
+        key = hashlib.blake2b(f"{prompt}|{Config.IMAGE_ASPECT_RATIO}|{style_ref}".encode("utf-8"), digest_size=16).hexdigest()
+        return self.image_cache_dir / f"{key}.jpeg"
+
+    @staticmethod
+    def _restore_cached_image(cache_file: Path, output_path: str) -> bool:
+        """Copies a cached image to output_path. Returns False on a cache miss."""
+        if not cache_file.exists():
+            return False
+        try:
+            shutil.copyfile(cache_file, output_path)
+            return True
+        except OSError as e:
+            logger.warning(f"Could not reuse cached image {cache_file}: {e}")
+            return False
+
+    @staticmethod
+    def _cached_image_prompt(cache_file: Path, base_prompt: str) -> str:
+        """The prompt that produced a cached image, which may include QA corrections on top of base_prompt."""
+        try:
+            return cache_file.with_suffix(".txt").read_text(encoding="utf-8")
+        except OSError:
+            # Entries cached before the prompt was stored alongside them
+            return base_prompt
+
+    def _store_cached_image(self, output_path: str, cache_file: Path, prompt: str):
+        # A copy rather than a hard link, so regenerating the asset in place can't alter the cached image
+        try:
+            self.image_cache_dir.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(output_path, cache_file)
+            cache_file.with_suffix(".txt").write_text(prompt, encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"Could not cache image {output_path}: {e}")
+
+    def _check_existing_semantic_batch(self, new_items: List[Union[Character, Location]], pool: Dict[str, Union[Character, Location]], kind: str) -> Dict[str, Optional[Union[Character, Location]]]:
+        """
+        Checks several new characters or locations against the catalog in a single AI request.
+        Returns {name: matched item or None}; names missing from the result fall back to the per-item check.
+        """
+        if len(new_items) < 2:
+            return {}
+
+        pool_items = [item for item in unique_items(pool) if item.id is not None]
+
+        if not pool_items:
+            return {}
+
+        # Resolve obvious matches and misses locally; only the rest go to the AI with their closest candidates
+        matches = {}
+        unresolved = []
+        cache_keys = []
+        shortlists = []
+        candidates = {}
+        for item in new_items:
+            shortlist = lexical_shortlist(item, pool_items)
+            best_score, best = shortlist[0]
+            if is_lexical_match(item, best_score, best):
+                matches[item.name] = best
+            elif is_lexical_miss(item, best_score):
+                matches[item.name] = None
+            else:
+                shortlisted = {c.id: c for _, c in shortlist}
+                cache_key = self._semantic_cache_key(kind, item, shortlisted.values())
+                if cache_key in self._semantic_cache:
+                    matches[item.name] = shortlisted.get(self._semantic_cache[cache_key])
+                    continue
+                unresolved.append(item)
+                cache_keys.append(cache_key)
+                shortlists.append(shortlisted)
+                candidates.update(shortlisted)
+
+        if not unresolved:
+            return matches
+        new_items = unresolved
+
+        new_items_text = "\n".join([
+            f"{i}. Name='{item.name}', Description='{item.description}', Candidate IDs: {', '.join(map(str, shortlisted))}"
+            for i, (item, shortlisted) in enumerate(zip(new_items, shortlists), 1)
+        ])
+        candidates_text = "\n".join([f"- ID {item.id}: Name='{item.name}', Description='{item.description}'" for item in candidates.values()])
+
+        prompt = f"""
+        I have several new {kind}s from a story and a database of existing {kind}s.
+        For EACH new {kind}, determine if it is actually the SAME {kind} as one of the existing ones, just referred to by a different name or description style.
+
+        New {kind.capitalize()}s:
+        {new_items_text}
+
+        Existing {kind.capitalize()}s Database:
+        {candidates_text}
 
-    def _check_existing_character_semantic(self, new_char: Character) -> Optional[Character]:
-        """Uses AI to check if the new character matches any existing character description."""
-        if not self.characters:
+        Task: Compare every new {kind} to the existing {kind}s listed in its Candidate IDs.
+        If there is a CLEAR and UNAMBIGUOUS match, return the ID of the existing {kind}.
+        If it is a new {kind} or you are unsure, return null.
+
+        Return ONLY a JSON object: {{"matches": [{{"item_index": <number of the new {kind}>, "match_id": <int or null>}}, ...]}}
+        """
+
+        try:
+            response_data = self.ai_client.generate_text(prompt, schema=SemanticBatchResult)
+            if isinstance(response_data, SemanticBatchResult):
+                result = response_data
+            else:
+                result = SemanticBatchResult.model_validate_json(json_utils.strip_code_fences(response_data))
+        except Exception as e:
+            logger.warning(f"Batch semantic match check failed for {len(new_items)} {kind}s: {e}")
+            return matches
+
+        for match in result.matches:
+            if 1 <= match.item_index <= len(new_items):
+                shortlisted = shortlists[match.item_index - 1]
+                if match.match_id is not None and match.match_id not in shortlisted:
+                    # Decisions are cached against the item's own shortlist, so an ID from outside it could not be
+                    # replayed; the item is left to the per-item check instead
+                    continue
+                matched = shortlisted.get(match.match_id)
+                matches[new_items[match.item_index - 1].name] = matched
+                self._remember_semantic_match(cache_keys[match.item_index - 1], matched)
+        return matches
+
+    def _check_existing_character_semantic(self, new_char: Character, pool: Optional[Dict[str, Character]] = None) -> Optional[Character]:
+        """Uses AI to check if the new character matches any existing character description (by default the whole catalog)."""
+        pool = self.characters if pool is None else pool
+        if not pool:
             return None
 
-        # Build list of existing candidates (unique by ID to avoid dupes in prompt)
-        # Use a dict to dedup by ID
-        unique_chars = {}
-        for c in self.characters.values():
-            if c.id is not None and c.id not in unique_chars:
-                unique_chars[c.id] = c
+        # Build list of existing candidates (aliases share their entity, so each is listed once)
+        unique_chars = {c.id: c for c in unique_items(pool) if c.id is not None}
         
         if not unique_chars:
             return None
 
+        shortlist = lexical_shortlist(new_char, unique_chars.values())
+        best_score, best = shortlist[0]
+        if is_lexical_match(new_char, best_score, best):
+            return best
+        if is_lexical_miss(new_char, best_score):
+            return None
+        unique_chars = {c.id: c for _, c in shortlist}
+
+        cache_key = self._semantic_cache_key("character", new_char, unique_chars.values())
+        if cache_key in self._semantic_cache:
+            return unique_chars.get(self._semantic_cache[cache_key])
+
         candidates_text = "\n".join([f"- ID {c.id}: Name='{c.name}', Description='{c.description}'" for c in unique_chars.values()])
 
         prompt = f"""
@@ -573,32 +1027,39 @@ class AssetManager:
             if isinstance(response_data, SemanticMatchResult):
                 data = response_data.model_dump()
             else:
-                clean_text = response_data.replace("```json", "").replace("```", "").strip()
-                data = json.loads(clean_text)
+                clean_text = json_utils.strip_code_fences(response_data)
+                data = json_utils.loads(clean_text)
             
-            match_id = data.get("match_id")
-            if match_id is not None:
-                for c in unique_chars.values():
-                    if c.id == match_id:
-                        return c
-            return None
+            match = unique_chars.get(data.get("match_id"))
+            self._remember_semantic_match(cache_key, match)
+            return match
         except Exception as e:
             logger.warning(f"Semantic match check failed for character {new_char.name}: {e}")
             return None
 
-    def _check_existing_location_semantic(self, new_loc: Location) -> Optional[Location]:
-        """Uses AI to check if the new location matches any existing location description."""
-        if not self.locations:
+    def _check_existing_location_semantic(self, new_loc: Location, pool: Optional[Dict[str, Location]] = None) -> Optional[Location]:
+        """Uses AI to check if the new location matches any existing location description (by default the whole catalog)."""
+        pool = self.locations if pool is None else pool
+        if not pool:
             return None
 
-        unique_locs = {}
-        for l in self.locations.values():
-            if l.id is not None and l.id not in unique_locs:
-                unique_locs[l.id] = l
+        unique_locs = {l.id: l for l in unique_items(pool) if l.id is not None}
         
         if not unique_locs:
             return None
 
+        shortlist = lexical_shortlist(new_loc, unique_locs.values())
+        best_score, best = shortlist[0]
+        if is_lexical_match(new_loc, best_score, best):
+            return best
+        if is_lexical_miss(new_loc, best_score):
+            return None
+        unique_locs = {c.id: c for _, c in shortlist}
+
+        cache_key = self._semantic_cache_key("location", new_loc, unique_locs.values())
+        if cache_key in self._semantic_cache:
+            return unique_locs.get(self._semantic_cache[cache_key])
+
         candidates_text = "\n".join([f"- ID {l.id}: Name='{l.name}', Description='{l.description}'" for l in unique_locs.values()])
 
         prompt = f"""
@@ -624,43 +1085,34 @@ class AssetManager:
             if isinstance(response_data, SemanticMatchResult):
                 data = response_data.model_dump()
             else:
-                clean_text = response_data.replace("```json", "").replace("```", "").strip()
-                data = json.loads(clean_text)
+                clean_text = json_utils.strip_code_fences(response_data)
+                data = json_utils.loads(clean_text)
             
-            match_id = data.get("match_id")
-            if match_id is not None:
-                for l in unique_locs.values():
-                    if l.id == match_id:
-                        return l
-            return None
+            match = unique_locs.get(data.get("match_id"))
+            self._remember_semantic_match(cache_key, match)
+            return match
         except Exception as e:
             logger.warning(f"Semantic match check failed for location {new_loc.name}: {e}")
             return None
 
+    @staticmethod
+    def _semantic_cache_key(kind: str, item: Union[Character, Location], candidates) -> str:
+        return LLMCache.make_key("semantic", kind, item.name, item.description, sorted((c.id, c.description) for c in candidates))
+
+    def _remember_semantic_match(self, cache_key: str, match: Optional[Union[Character, Location]]):
+        self._semantic_cache[cache_key] = match.id if match else None
+        self._dirty = True
+
     def get_character_data(self, name: str) -> Optional[Character]:
-        if name in self.characters:
-            return self.characters[name]
-        
-        for key, char in self.characters.items():
-            if name in key or key in name:
-                return char
-        return None
+        return self.characters.find(name)
 
     def get_location_data(self, name: str) -> Optional[Location]:
-        if name in self.locations:
-            return self.locations[name]
-        
-        for key, loc in self.locations.items():
-            if name in key or key in name:
-                return loc
-        return None
+        return self.locations.find(name)
 
     def get_character_ref(self, name: str) -> str:
         char = self.get_character_data(name)
         return char.reference_image_path if char else None
 
     def get_location_ref(self, name: str) -> str:
-        for key, loc in self.locations.items():
-            if name in key or key in name:
-                return loc.reference_image_path
-        return None
+        loc = self.get_location_data(name)
+        return loc.reference_image_path if loc else None
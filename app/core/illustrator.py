@@ -1,17 +1,37 @@
 import logging
-import json
 import os
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import concurrent.futures
 
 from app.core.ai_client import GenAIClient
-from app.core.asset_manager import AssetManager
+from app.core.asset_manager import AssetManager, catalog_records
 from app.core.models import Scene
 from app.config import Config
+from app.utils import json_utils
 
 logger = logging.getLogger(__name__)
 
+# Scene prompt template (filled with str.format) and the QA rules every illustration is checked against
+_SCENE_PROMPT = (
+    "{style}. **Single cinematic frame. One single cohesive image.**\n"
+    "**Follow the visual style of the attached reference images precisely.**\n"
+    "**STRICTLY NO multi-panels, NO comic book layout, NO grid, NO split screen.**\n"
+    "**NO text, NO captions, NO speech bubbles.**\n\n"
+    "--- MANDATORY VISUAL DETAILS ---\n"
+    "You MUST faithfully represent the following entities in the scene using these exact descriptions:\n"
+    "{anchors}\n"
+    "--------------------------------\n\n"
+    "Scene context: {visual}\n"
+    "Action taking place: {action}\n"
+    "Setting: {location}, {time_of_day}. Mood: {mood}."
+)
+_SCENE_VALIDATION_RULES = """
+1. Single Frame Rule: The image MUST be a single cinematic shot. NO split screens, NO comic book panels, NO grid layouts, NO borders.
+2. No Text Rule: The image MUST contain NO text, NO watermarks, NO speech bubbles, and NO UI elements.
+3. Character Consistency Rule: STRICTLY compare the characters in the generated image with the provided reference images and text descriptions. The characters MUST perfectly match their original appearance.
+"""
+
 
 class StoryIllustrator:
     def __init__(self, ai_client: GenAIClient, asset_manager: AssetManager, output_dir: Path):
@@ -21,16 +41,71 @@ class StoryIllustrator:
         self.output_dir.mkdir(parents=True, exist_ok=True)
         # Registry for all generated illustrations
         self.illustrations_registry = []
+        # Catalog lookups memoized for the duration of illustrate_scenes (the catalog doesn't change meanwhile)
+        self._lookup_cache: Optional[dict] = None
 
     def illustrate_scenes(self, scenes: List[Scene], style_prompt: str):
-        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-            futures = [executor.submit(self._process_single_scene, scene, style_prompt) for scene in scenes]
-            concurrent.futures.wait(futures)
+        self._lookup_cache = {}
+        try:
+            self._illustrate_scenes(scenes, style_prompt)
+        finally:
+            self._lookup_cache = None
+
+    def _illustrate_scenes(self, scenes: List[Scene], style_prompt: str):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=Config.MAX_IMAGE_CONCURRENCY) as executor:
+            # One directory listing answers the "already illustrated?" check for every scene
+            existing_files = set(os.listdir(self.output_dir))
+            futures = [executor.submit(self._prepare_scene, scene, existing_files) for scene in scenes]
+            pending = [job for job in self._collect_results(futures) if job is not None]
+
+            highlights = self._analyze_highlights(pending)
+
+            futures = [
+                executor.submit(self._render_scene, scene, style_prompt, img_file, scene_metadata, highlight_data)
+                for (scene, img_file, scene_metadata), highlight_data in zip(pending, highlights)
+            ]
+            self._collect_results(futures)
 
         # Save global manifest after processing all scenes
         self._save_data_json(style_prompt)
 
-    def _process_single_scene(self, scene: Scene, style_prompt: str):
+    def _catalog_lookup(self, method_name: str, name: str):
+        """Calls an asset manager lookup (e.g. get_character_data), memoized while a run is in progress."""
+        lookup = getattr(self.asset_manager, method_name)
+        if self._lookup_cache is None:
+            return lookup(name)
+
+        key = (method_name, name)
+        if key not in self._lookup_cache:
+            self._lookup_cache[key] = lookup(name)
+        return self._lookup_cache[key]
+
+    @staticmethod
+    def _collect_results(futures: List[concurrent.futures.Future]) -> List:
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Scene processing failed: {e}")
+        return results
+
+    def _analyze_highlights(self, pending: List[Tuple[Scene, Path, dict]]) -> List[Optional[dict]]:
+        """Runs highlight analysis for all pending scenes as one batch job when enabled."""
+        if not Config.HIGHLIGHT_BATCH_MODE or len(pending) < 2:
+            # Analyzed per scene inside the render workers
+            return [None] * len(pending)
+
+        logger.info(f"Analyzing {len(pending)} scenes for highlight moments in batch mode...")
+        return self.ai_client.analyze_scenes_batch(
+            [(scene.original_text_segment, scene.characters_present) for scene, _, _ in pending]
+        )
+
+    def _prepare_scene(self, scene: Scene, existing_files: Optional[set] = None) -> Optional[Tuple[Scene, Path, dict]]:
+        """
+        Registers scene metadata. Returns the render job, or None if the illustration already exists.
+        existing_files is an optional listing of the illustrations directory.
+        """
         # 1. Generate filename slug
         slug = self.ai_client.generate_filename_slug(scene.visual_description or scene.summary)
         filename = f"{scene.id}_{slug}.jpeg"
@@ -38,21 +113,21 @@ class StoryIllustrator:
         img_file = self.output_dir / filename
 
         # 2. Collect location info
-        loc_data = self.asset_manager.get_location_data(scene.location_name)
+        loc_data = self._catalog_lookup("get_location_data", scene.location_name)
         location_info = {
-            "id": getattr(loc_data, 'id', None),
+            "id": loc_data.id if loc_data else None,
             "name": scene.location_name
         }
 
         # 3. Collect character info
         characters_info = []
         for char_name in scene.characters_present:
-            char_data = self.asset_manager.get_character_data(char_name)
+            char_data = self._catalog_lookup("get_character_data", char_name)
             if char_data:
                 characters_info.append({
-                    "id": getattr(char_data, 'id', None),
+                    "id": char_data.id,
                     "name": char_name,
-                    "full_body_path": getattr(char_data, 'full_body_path', None)
+                    "full_body_path": char_data.full_body_path
                 })
 
         # 4. Save Scene JSON Metadata
@@ -62,21 +137,27 @@ class StoryIllustrator:
             "name": slug,
             "location": location_info,
             "characters": characters_info,
-            "illustration_path": str(img_file.relative_to(self.output_dir.parent)),
+            # Relative to the output root, which is the parent of illustrations/
+            "illustration_path": os.path.join(self.output_dir.name, filename),
             "generation_prompt": None
         }
         
         self.illustrations_registry.append(scene_metadata)
 
-        if img_file.exists():
+        already_exists = img_file.exists() if existing_files is None else filename in existing_files
+        if already_exists:
             logger.info(f"Illustration for scene {scene.id} exists. Skipping generation.")
-            return
+            return None
 
-        logger.info(f"Analyzing scene {scene.id} for highlight moment...")
-        highlight_data = self.ai_client.analyze_scene_for_highlight(
-            scene.original_text_segment, 
-            available_characters=scene.characters_present
-        )
+        return scene, img_file, scene_metadata
+
+    def _render_scene(self, scene: Scene, style_prompt: str, img_file: Path, scene_metadata: dict, highlight_data: Optional[dict] = None):
+        if highlight_data is None:
+            logger.info(f"Analyzing scene {scene.id} for highlight moment...")
+            highlight_data = self.ai_client.analyze_scene_for_highlight(
+                scene.original_text_segment, 
+                available_characters=scene.characters_present
+            )
         highlight_prompt = highlight_data.get("image_prompt")
         highlight_desc = highlight_data.get("highlight_description")
         active_characters = highlight_data.get("active_characters")
@@ -90,41 +171,46 @@ class StoryIllustrator:
         manifest_path = self.output_dir.parent / "data.json"
         ordered_list = sorted(self.illustrations_registry, key=lambda x: x['scene_id'])
         
-        # Collect character data for export
-        char_list = []
-        for name, char in self.asset_manager.characters.items():
-            c_data = {
-                "id": char.id,
-                "original_name": char.original_name or name,
-                "name": char.name,
-                "description": char.description,
-                "reference_image_path": char.reference_image_path,
-                "full_body_path": char.full_body_path,
-                "generation_prompt": char.generation_prompt
-            }
-            char_list.append(c_data)
-
-        # Collect location data for export
-        loc_list = []
-        for name, loc in self.asset_manager.locations.items():
-            loc_list.append({
-                "id": loc.id,
-                "original_name": loc.original_name or name,
-                "name": loc.name,
-                "description": loc.description,
-                "reference_image_path": loc.reference_image_path,
-                "generation_prompt": loc.generation_prompt
-            })
+        # Collect character and location data for export (one record per entity, plus alias names)
+        char_list, char_aliases = catalog_records(self.asset_manager.characters)
+        loc_list, loc_aliases = catalog_records(self.asset_manager.locations)
+
+        # Fields written by other components (e.g. the asset manager's semantic-match cache) are kept
+        data = {}
+        if manifest_path.exists():
+            try:
+                data = json_utils.load_file(manifest_path)
+            except Exception as e:
+                logger.warning(f"Could not read existing manifest {manifest_path}: {e}")
+            if not isinstance(data, dict):
+                logger.warning(f"Existing manifest {manifest_path} is not a JSON object; rewriting it.")
+                data = {}
+
+        # Scenes skipped because their illustration already exists keep the prompt recorded by the earlier run
+        previous_entries = data.get("illustrations")
+        previous = {
+            entry.get("illustration_path"): entry
+            for entry in (previous_entries if isinstance(previous_entries, list) else []) if isinstance(entry, dict)
+        }
+        for entry in ordered_list:
+            if entry["generation_prompt"] is None:
+                entry["generation_prompt"] = previous.get(entry["illustration_path"], {}).get("generation_prompt")
 
-        data = {
+        updated = {
+            **data,
             "style_prompt": style_prompt,
             "characters": char_list,
+            "character_aliases": char_aliases,
             "locations": loc_list,
+            "location_aliases": loc_aliases,
             "illustrations": ordered_list
         }
-        
-        with open(manifest_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        if updated == data:
+            # e.g. a re-run where every illustration already existed
+            logger.info(f"Global manifest {manifest_path} is up to date")
+            return
+
+        json_utils.dump_file(updated, manifest_path)
         logger.info(f"Global manifest saved to {manifest_path}")
 
     def _generate_scene_image(self, scene: Scene, style_prompt: str, output_path: Path, highlight_prompt: Optional[str] = None, highlight_desc: Optional[str] = None, active_characters: Optional[List[str]] = None) -> Optional[str]:
@@ -136,7 +222,7 @@ class StoryIllustrator:
         
         # 1. Collect data for ALL scene characters (Text + Image)
         for char_name in chars_to_include:
-            char_data = self.asset_manager.get_character_data(char_name)
+            char_data = self._catalog_lookup("get_character_data", char_name)
             if char_data:
                 # Add textual anchor
                 anchors_text_blocks.append(f"[CHARACTER '{char_name}']: {char_data.description}")
@@ -151,11 +237,11 @@ class StoryIllustrator:
                     })
 
         # 2. Collect location data (Text + Image)
-        loc_data = self.asset_manager.get_location_data(scene.location_name)
+        loc_data = self._catalog_lookup("get_location_data", scene.location_name)
         if loc_data:
             anchors_text_blocks.append(f"[LOCATION '{scene.location_name}']: {loc_data.description}")
             
-        loc_ref = self.asset_manager.get_location_ref(scene.location_name)
+        loc_ref = self._catalog_lookup("get_location_ref", scene.location_name)
         if loc_ref:
             reference_images.append({
                 "path": loc_ref,
@@ -168,25 +254,12 @@ class StoryIllustrator:
         visual_core = highlight_prompt if highlight_prompt else scene.visual_description
         action_core = highlight_desc if highlight_desc else scene.action_description
 
-        validation_rules = """
-        1. Single Frame Rule: The image MUST be a single cinematic shot. NO split screens, NO comic book panels, NO grid layouts, NO borders.
-        2. No Text Rule: The image MUST contain NO text, NO watermarks, NO speech bubbles, and NO UI elements.
-        3. Character Consistency Rule: STRICTLY compare the characters in the generated image with the provided reference images and text descriptions. The characters MUST perfectly match their original appearance.
-        """
+        validation_rules = _SCENE_VALIDATION_RULES
 
         # 4. Form structured prompt with strong context
-        base_prompt = (
-            f"{style_prompt}. **Single cinematic frame. One single cohesive image.**\n"
-            f"**Follow the visual style of the attached reference images precisely.**\n"
-            f"**STRICTLY NO multi-panels, NO comic book layout, NO grid, NO split screen.**\n"
-            f"**NO text, NO captions, NO speech bubbles.**\n\n"
-            f"--- MANDATORY VISUAL DETAILS ---\n"
-            f"You MUST faithfully represent the following entities in the scene using these exact descriptions:\n"
-            f"{anchors_text}\n"
-            f"--------------------------------\n\n"
-            f"Scene context: {visual_core}\n"
-            f"Action taking place: {action_core}\n"
-            f"Setting: {scene.location_name}, {scene.time_of_day}. Mood: {scene.mood}."
+        base_prompt = _SCENE_PROMPT.format(
+            style=style_prompt, anchors=anchors_text, visual=visual_core, action=action_core,
+            location=scene.location_name, time_of_day=scene.time_of_day, mood=scene.mood
         )
 
         attempt = 1
@@ -243,7 +316,7 @@ class StoryIllustrator:
 
     def _select_character_ref(self, char_name: str, scene: Scene) -> Optional[str]:
         """Selects character reference (always full body now)."""
-        char_data = self.asset_manager.get_character_data(char_name)
+        char_data = self._catalog_lookup("get_character_data", char_name)
         if not char_data:
             return None
             
@@ -0,0 +1,55 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+from app.utils import json_utils
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """
+    Persistent key/value cache for deterministic LLM calls (translations, slugs, highlights).
+    Backed by a single SQLite file so results survive between runs.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Builds a stable sha256 key from JSON-serializable parts."""
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            return json_utils.loads(row[0]) if row else None
+        except Exception as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+
+    def set(self, key: str, value: Any):
+        try:
+            payload = json.dumps(value, ensure_ascii=False)
+            with self._lock:
+                self._conn.execute("INSERT OR REPLACE INTO llm_cache (key, value) VALUES (?, ?)", (key, payload))
+                self._conn.commit()
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -14,6 +14,13 @@ class SemanticMatchResult(BaseModel):
     match_id: Optional[int] = Field(default=None, description="The integer ID of the matched entity, or null if no match.")
     reason: str = Field(description="The reason for the match or non-match.")
 
+class SemanticMatchItem(BaseModel):
+    item_index: int = Field(description="The number of the new item in the provided list.")
+    match_id: Optional[int] = Field(default=None, description="The integer ID of the matched entity, or null if no match.")
+
+class SemanticBatchResult(BaseModel):
+    matches: List[SemanticMatchItem] = Field(description="One match decision for every new item.")
+
 class Character(BaseModel):
     id: Optional[int] = Field(default=None, description="Unique identifier for the character")
     name: str = Field(description="Name of the character")
@@ -24,6 +31,11 @@ class Character(BaseModel):
     full_body_path: Optional[str] = Field(default=None, description="Path to the full body reference image")
     original_name: Optional[str] = Field(default=None, description="Original name from the text")
 
+    @classmethod
+    def from_record(cls, item: dict) -> "Character":
+        """Builds a character from a data.json record in one validation pass (name falls back to original_name)."""
+        return cls.model_validate({**item, "name": item.get("name", item.get("original_name", "Unknown"))})
+
 class Location(BaseModel):
     id: Optional[int] = Field(default=None, description="Unique identifier for the location")
     name: str = Field(description="Name of the location")
@@ -32,6 +44,15 @@ class Location(BaseModel):
     reference_image_path: Optional[str] = Field(default=None, description="Path to the generated reference image")
     original_name: Optional[str] = Field(default=None, description="Original name from the text")
 
+    @classmethod
+    def from_record(cls, item: dict) -> "Location":
+        """Builds a location from a data.json record in one validation pass (name falls back to original_name)."""
+        return cls.model_validate({**item, "name": item.get("name", item.get("original_name", "Unknown"))})
+
+class SceneEntities(BaseModel):
+    characters: List[Character] = Field(default_factory=list, description="Key characters in the text")
+    locations: List[Location] = Field(default_factory=list, description="Main locations in the text")
+
 class Scene(BaseModel):
     id: int = Field(..., description="Sequence number of the scene (unique id)")
     start_index: int = Field(..., description="Index of the start of the scene in the original text")
@@ -0,0 +1,43 @@
+import json
+import os
+import re
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib parser is used without it
+    orjson = None
+
+# Markdown code fences that models sometimes wrap JSON responses in
+_FENCE_RE = re.compile(r"```(?:json)?")
+
+
+def strip_code_fences(text: str) -> str:
+    """Removes ```json / ``` fences from a model response in a single pass."""
+    return _FENCE_RE.sub("", text).strip()
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parses JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_file(path) -> Any:
+    """Reads and parses a JSON file."""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def dump_file(data: Any, path):
+    """Atomically writes data as indented UTF-8 JSON (temp file + rename)."""
+    tmp_path = f"{path}.tmp"
+    if orjson is not None:
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # Same layout as orjson.OPT_INDENT_2, so the file does not depend on which encoder is installed
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
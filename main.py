@@ -8,6 +8,7 @@ from app.core.ai_client import GenAIClient
 from app.core.analyzer import StoryAnalyzer
 from app.core.asset_manager import AssetManager
 from app.core.illustrator import StoryIllustrator
+from app.core.llm_cache import LLMCache
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -39,7 +40,7 @@ def main(text_file, style_prompt, output_dir):
     logger.info(f"Loaded text file: {text_file} ({len(text_content)} chars)")
 
     # 2. Initialize Core Components
-    ai_client = GenAIClient()
+    ai_client = GenAIClient(cache=LLMCache(output_path / ".llm_cache.db"))
     analyzer = StoryAnalyzer(ai_client)
     asset_manager = AssetManager(ai_client, output_path)
     illustrator = StoryIllustrator(ai_client, asset_manager, output_path)
@@ -60,9 +61,9 @@ def main(text_file, style_prompt, output_dir):
     scenes = analyzer.extract_scenes(text_content)
     logger.info(f"Identified {len(scenes)} scenes.")
 
-    # 5. Iterative Generation Loop
-    # We iterate through scene groups (chunks) or scene-by-scene to extract entities
-    # and generate assets dynamically as the story progresses.
+    # 5. Iterative Asset Loop
+    # We iterate scene-by-scene to extract entities and generate assets
+    # dynamically as the story progresses.
 
     logger.info("Starting processing loop...")
 
@@ -77,17 +78,14 @@ def main(text_file, style_prompt, output_dir):
 
         scene_text = scene.original_text_segment
 
-        # Extract Characters in this scene
-        chars_in_scene = analyzer.extract_characters(scene_text)
+        # Extract Characters and Locations in this scene (one request for both)
+        chars_in_scene, locs_in_scene = analyzer.extract_entities(scene_text)
         asset_manager.generate_character_assets(chars_in_scene, detected_style)
         
         # Synchronize scene characters with actual names from the catalog
         if chars_in_scene:
             scene.characters_present = [char.name for char in chars_in_scene]
 
-        # Extract Locations in this scene
-        locs_in_scene = analyzer.extract_locations(scene_text)
-        
         if locs_in_scene:
             # The scene model already has a location_name assigned by the AI. Find the matching location details.
             primary_loc = None
@@ -109,8 +107,10 @@ def main(text_file, style_prompt, output_dir):
             # Synchronize scene location with the actual location from the catalog
             scene.location_name = primary_loc.name
 
-        # Generate Illustration
-        illustrator.illustrate_scenes([scene], detected_style)
+    # 6. Generate Illustrations
+    # All assets are ready, so scenes are rendered concurrently in one pass.
+    logger.info(f"Generating illustrations for {len(scenes)} scenes...")
+    illustrator.illustrate_scenes(scenes, detected_style)
 
     logger.info("Job Complete! Check the output directory.")
 
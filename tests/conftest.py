@@ -18,3 +18,9 @@ def mock_env(monkeypatch):
     """Fixture to mock environment variables."""
     monkeypatch.setenv("GOOGLE_API_KEY", "fake_key")
     monkeypatch.setenv("GEMINI_MODEL", "gemini-test-model")
+
+@pytest.fixture(autouse=True)
+def reset_genai_client_singleton(monkeypatch):
+    """Ensures every test builds its own (mocked) shared genai.Client."""
+    import app.core.ai_client as ai_client_module
+    monkeypatch.setattr(ai_client_module, "_CLIENT", None)
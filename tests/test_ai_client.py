@@ -23,14 +23,24 @@ class TestGenAIClient:
         args, kwargs = mock_instance.models.generate_content.call_args
         assert kwargs['model'] == ai_client.text_model_name
 
+    def test_sdk_client_is_shared(self, ai_client, mock_genai_client):
+        second = GenAIClient()
+        assert second.client is ai_client.client
+        mock_genai_client.assert_called_once()
+
     def test_translate_to_english(self, ai_client):
         # Mock generate_text since translate calls it
         # This mocks the method on the ai_client instance we are testing
         with patch.object(ai_client, 'generate_text', return_value="Translation"):
-            result = ai_client.translate_to_english("Original")
+            result = ai_client.translate_to_english("Оригинал")
             assert result == "Translation"
             ai_client.generate_text.assert_called()
 
+    def test_translate_to_english_skips_english_input(self, ai_client):
+        with patch.object(ai_client, 'generate_text') as generate_text:
+            assert ai_client.translate_to_english(" Old Forest ") == "Old_Forest"
+            generate_text.assert_not_called()
+
     def test_generate_image(self, ai_client, mock_genai_client, tmp_path):
         # Prepare mock response with image part
         mock_instance = mock_genai_client.return_value
@@ -87,14 +97,18 @@ class TestGenAIClient:
 
     def test_translate_to_english_exception(self, ai_client):
         with patch.object(ai_client, 'generate_text', side_effect=Exception("Trans Error")):
-            result = ai_client.translate_to_english("Original")
-            assert result == "Original" 
+            result = ai_client.translate_to_english("Оригинал")
+            assert result == "Оригинал" 
 
     def test_generate_filename_slug(self, ai_client):
         with patch.object(ai_client, 'generate_text', return_value="my_slug"):
             slug = ai_client.generate_filename_slug("desc")
             assert slug == "my_slug"
             
+    def test_generate_filename_slug_sanitizes(self, ai_client):
+        with patch.object(ai_client, 'generate_text', return_value=" `Hero-Draws_Sword!`.jpeg\n"):
+            assert ai_client.generate_filename_slug("desc") == "herodraws_swordjpeg"
+
     def test_generate_filename_slug_exception(self, ai_client):
         with patch.object(ai_client, 'generate_text', side_effect=Exception("Slug Error")):
             slug = ai_client.generate_filename_slug("desc")
@@ -168,6 +182,38 @@ class TestGenAIClient:
         
         mock_pil.save.assert_called_with(str(output_path))
 
+    def test_generate_image_writes_inline_bytes(self, ai_client, mock_genai_client, tmp_path):
+        from google.genai import types
+        mock_instance = mock_genai_client.return_value
+        mock_response = MagicMock()
+        mock_response.parts = [types.Part.from_bytes(data=b"encoded-jpeg", mime_type="image/jpeg")]
+        mock_instance.models.generate_content.return_value = mock_response
+
+        output_path = tmp_path / "out.jpg"
+        with patch.object(types.Part, "as_image") as as_image:
+            ai_client.generate_image("prompt", output_path=str(output_path))
+
+        assert output_path.read_bytes() == b"encoded-jpeg"
+        as_image.assert_not_called()
+
+    def test_generate_image_transcodes_mismatched_format(self, ai_client, mock_genai_client, tmp_path):
+        import io
+        from google.genai import types
+        png = io.BytesIO()
+        Image.new("RGBA", (2, 2), (255, 0, 0, 128)).save(png, format="PNG")
+        mock_instance = mock_genai_client.return_value
+        mock_response = MagicMock()
+        mock_response.parts = [types.Part.from_bytes(data=png.getvalue(), mime_type="image/png")]
+        mock_instance.models.generate_content.return_value = mock_response
+
+        output_path = tmp_path / "out.jpg"
+        ai_client.generate_image("prompt", output_path=str(output_path))
+
+        # The PNG payload is re-encoded to match the .jpg extension
+        with Image.open(output_path) as saved:
+            assert saved.format == "JPEG"
+            assert saved.mode == "RGB"
+
     def test_generate_image_no_image_returned(self, ai_client, mock_genai_client, tmp_path):
         mock_instance = mock_genai_client.return_value
         mock_response = MagicMock()
@@ -177,16 +223,59 @@ class TestGenAIClient:
         with pytest.raises(RuntimeError, match="no images"):
             ai_client.generate_image("prompt", output_path="out.jpg")
 
-    def test_generate_image_exception(self, ai_client, mock_genai_client):
+    def test_generate_image_parts_none(self, ai_client, mock_genai_client, tmp_path):
+        mock_response = MagicMock()
+        mock_response.parts = None
+        mock_genai_client.return_value.models.generate_content.return_value = mock_response
+
+        with pytest.raises(RuntimeError, match="no images"):
+            ai_client.generate_image("prompt", output_path=str(tmp_path / "out.jpg"))
+
+    def test_generate_image_stops_at_first_image(self, ai_client, mock_genai_client, tmp_path):
+        first, second = MagicMock(), MagicMock()
+        first.image.image_bytes = b"first"
+        mock_response = MagicMock()
+        mock_response.parts = [first, second]
+        mock_genai_client.return_value.models.generate_content.return_value = mock_response
+
+        output_path = tmp_path / "out.jpg"
+        ai_client.generate_image("prompt", output_path=str(output_path))
+
+        assert output_path.read_bytes() == b"first"
+        second.as_image.assert_not_called()
+
+    def test_generate_image_exception(self, ai_client, mock_genai_client, tmp_path):
         mock_instance = mock_genai_client.return_value
         mock_instance.models.generate_content.side_effect = Exception("Gen Error")
         
         with pytest.raises(Exception, match="Gen Error"):
-            ai_client.generate_image("prompt")
+            ai_client.generate_image("prompt", output_path=str(tmp_path / "out.jpg"))
 
-    @patch("app.core.ai_client.Image")
-    def test_validate_image_success(self, mock_image, ai_client, mock_genai_client):
+    def test_generate_image_requires_output_path(self, ai_client, mock_genai_client):
+        # Validated before the retried request, so it fails at once without backoff
+        with patch.object(ai_client, '_generate_image') as retried:
+            with pytest.raises(ValueError, match="output_path"):
+                ai_client.generate_image("prompt")
+        retried.assert_not_called()
+        mock_genai_client.return_value.models.generate_content.assert_not_called()
+
+    def test_generate_image_creates_output_dir(self, ai_client, mock_genai_client, tmp_path):
+        mock_instance = mock_genai_client.return_value
+        mock_response = MagicMock()
+        mock_part = MagicMock()
+        mock_part.image.image_bytes = b"fake"
+        mock_response.parts = [mock_part]
+        mock_instance.models.generate_content.return_value = mock_response
+
+        output_path = tmp_path / "nested" / "dir" / "out.jpg"
+        ai_client.generate_image("prompt", output_path=str(output_path))
+
+        assert output_path.read_bytes() == b"fake"
+
+    def test_validate_image_success(self, ai_client, mock_genai_client, tmp_path):
         from app.core.models import ImageValidationResult
+        image_path = tmp_path / "fake.png"
+        Image.new("RGB", (2, 2), "white").save(image_path)
         
         mock_instance = mock_genai_client.return_value
         mock_response = MagicMock()
@@ -194,37 +283,42 @@ class TestGenAIClient:
         mock_response.parsed = ImageValidationResult(is_valid=True, feedback="")
         mock_instance.models.generate_content.return_value = mock_response
         
-        result = ai_client.validate_image("fake.jpg", "rules")
+        result = ai_client.validate_image(str(image_path), "rules")
         assert result.is_valid is True
         
-    @patch("app.core.ai_client.Image")
-    def test_validate_image_success_fallback(self, mock_image, ai_client, mock_genai_client):
+    def test_validate_image_success_fallback(self, ai_client, mock_genai_client, tmp_path):
+        image_path = tmp_path / "fake.png"
+        Image.new("RGB", (2, 2), "white").save(image_path)
         mock_instance = mock_genai_client.return_value
         mock_response = MagicMock()
         mock_response.text = '{"is_valid": false, "feedback": "bad"}'
         mock_response.parsed = None
         mock_instance.models.generate_content.return_value = mock_response
         
-        result = ai_client.validate_image("fake.jpg", "rules")
+        result = ai_client.validate_image(str(image_path), "rules")
         assert result.is_valid is False
         assert result.feedback == "bad"
         
-    @patch("app.core.ai_client.Image")
-    def test_validate_image_with_refs(self, mock_image, ai_client, mock_genai_client):
+    def test_validate_image_with_refs(self, ai_client, mock_genai_client, tmp_path):
         from app.core.models import ImageValidationResult
+        image_path = tmp_path / "fake.png"
+        ref_path = tmp_path / "ref.jpg"
+        Image.new("RGB", (2, 2), "white").save(image_path)
+        Image.new("RGB", (2, 2), "black").save(ref_path)
         
         mock_instance = mock_genai_client.return_value
         mock_response = MagicMock()
         mock_response.parsed = ImageValidationResult(is_valid=True, feedback="")
         mock_instance.models.generate_content.return_value = mock_response
         
-        import os
-        with patch("os.path.exists", return_value=True):
-            result = ai_client.validate_image("fake.jpg", "rules", [{"path": "ref.jpg"}])
+        result = ai_client.validate_image(str(image_path), "rules", [{"path": str(ref_path)}])
             
         assert result.is_valid is True
         args, kwargs = mock_instance.models.generate_content.call_args
-        assert len(kwargs['contents']) == 3 
+        assert len(kwargs['contents']) == 3
+        assert kwargs['contents'][1].inline_data.mime_type == "image/png"
+        assert kwargs['contents'][2].inline_data.data == ref_path.read_bytes()
+        assert kwargs['contents'][2].inline_data.mime_type == "image/jpeg"
 
     def test_validate_image_exception(self, ai_client, mock_genai_client):
         mock_instance = mock_genai_client.return_value
@@ -248,6 +342,72 @@ class TestGenAIClient:
         with pytest.raises(RuntimeError, match="Gemini generation returned no images."):
             ai_client.generate_image("prompt", output_path=str(tmp_path / "out.jpg"))
 
+    def test_generate_image_reuses_loaded_reference(self, ai_client, mock_genai_client, tmp_path):
+        ref_path = tmp_path / "ref.png"
+        Image.new("RGB", (4, 4), "white").save(ref_path)
+
+        mock_instance = mock_genai_client.return_value
+        mock_response = MagicMock()
+        mock_part = MagicMock()
+        mock_part.image.image_bytes = b"fake"
+        mock_response.parts = [mock_part]
+        mock_instance.models.generate_content.return_value = mock_response
+
+        refs = [{"path": str(ref_path)}]
+        with patch("PIL.Image.open", wraps=Image.open) as opener:
+            ai_client.generate_image("prompt", reference_images=refs, output_path=str(tmp_path / "a.jpg"))
+            ai_client.generate_image("prompt", reference_images=refs, output_path=str(tmp_path / "b.jpg"))
+
+        assert opener.call_count == 1
+        first_ref = mock_instance.models.generate_content.call_args_list[0].kwargs['contents'][1]
+        second_ref = mock_instance.models.generate_content.call_args_list[1].kwargs['contents'][1]
+        assert first_ref is second_ref
+
+    def test_generate_image_loads_references_in_order(self, ai_client, mock_genai_client, tmp_path):
+        colors = ["red", "green", "blue"]
+        refs = []
+        for color in colors:
+            path = tmp_path / f"{color}.png"
+            Image.new("RGB", (2, 2), color).save(path)
+            refs.append({"path": str(path)})
+        refs.insert(1, {"path": str(tmp_path / "missing.png")})
+
+        mock_instance = mock_genai_client.return_value
+        mock_response = MagicMock()
+        mock_part = MagicMock()
+        mock_part.image.image_bytes = b"fake"
+        mock_response.parts = [mock_part]
+        mock_instance.models.generate_content.return_value = mock_response
+
+        ai_client.generate_image("prompt", reference_images=refs, output_path=str(tmp_path / "out.jpg"))
+
+        contents = mock_instance.models.generate_content.call_args.kwargs['contents']
+        # References are sent as their original file bytes, in order
+        assert [part.inline_data.data for part in contents[1:]] == [(tmp_path / f"{color}.png").read_bytes() for color in colors]
+
+    def test_generate_image_deduplicates_references(self, ai_client, mock_genai_client, tmp_path):
+        ref_path = tmp_path / "hero.png"
+        Image.new("RGB", (2, 2), "white").save(ref_path)
+        refs = [
+            {"path": str(ref_path), "purpose": "Hero appearance", "usage": "Keep the face."},
+            {"path": str(ref_path), "purpose": "Outfit", "usage": "Keep the armor."},
+        ]
+
+        mock_instance = mock_genai_client.return_value
+        mock_response = MagicMock()
+        mock_part = MagicMock()
+        mock_part.image.image_bytes = b"fake"
+        mock_response.parts = [mock_part]
+        mock_instance.models.generate_content.return_value = mock_response
+
+        ai_client.generate_image("prompt", reference_images=refs, output_path=str(tmp_path / "out.jpg"))
+
+        contents = mock_instance.models.generate_content.call_args.kwargs['contents']
+        assert len(contents) == 2
+        assert contents[0].count("File: hero.png") == 1
+        assert "Purpose: Hero appearance; Outfit" in contents[0]
+        assert "Instruction: Keep the face. Keep the armor." in contents[0]
+
     def test_generate_image_reference_open_exception(self, ai_client, mock_genai_client, tmp_path):
         ref_path = tmp_path / "fake.jpg"
         ref_path.touch()
@@ -269,3 +429,14 @@ class TestGenAIClient:
             args, kwargs = mock_instance.models.generate_content.call_args
             assert len(kwargs['contents']) == 1 # Only the prompt, image failed to load
 
+
+
+def test_module_import_defers_sdk_and_pillow():
+    import subprocess
+    import sys
+    code = (
+        "import sys, app.core.ai_client; "
+        "print('google.genai.types' in sys.modules, 'PIL.ImageFile' in sys.modules)"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False False"
@@ -11,6 +11,8 @@ def analyzer(mock_genai_client):
     # or just mock the GenAIClient object passed to Analyzer.
     # Here we mock the GenAIClient object directly for simpler testing of Analyzer logic.
     mock_client = MagicMock()
+    # No response cache: every call goes to the model
+    mock_client.cached.side_effect = lambda namespace, parts, compute, **kwargs: compute()
     return StoryAnalyzer(mock_client)
 
 class TestStoryAnalyzer:
@@ -54,9 +56,34 @@ class TestStoryAnalyzer:
         # Check re-indexing
         assert scenes[0].id == 1 
 
+    def test_extract_scenes_sends_chunk_as_separate_part(self, analyzer):
+        analyzer.ai_client.generate_text.return_value = "[]"
+        text = "Alice walked in the park."
+
+        analyzer.extract_scenes(text)
+
+        contents = analyzer.ai_client.generate_text.call_args.args[0]
+        assert contents[1] is text
+        assert "Start of the story." in contents[0]
+
+    def test_extract_scenes_chunk_size_is_configurable(self, analyzer, monkeypatch):
+        from app.config import Config
+        analyzer.ai_client.generate_text.return_value = "[]"
+        text = "word " * 3000
+
+        monkeypatch.setattr(Config, "SCENE_CHUNK_SIZE", 5000)
+        analyzer.extract_scenes(text)
+        # Three scene requests plus two context summaries between them
+        assert analyzer.ai_client.generate_text.call_count == 5
+
+        analyzer.ai_client.generate_text.reset_mock()
+        monkeypatch.setattr(Config, "SCENE_CHUNK_SIZE", 20000)
+        analyzer.extract_scenes(text)
+        assert analyzer.ai_client.generate_text.call_count == 1
+
     def test_extract_characters(self, analyzer):
         char_data = [{"name": "Alice", "description": "Blonde girl", "original_name": "Alice_Rus"}]
-        analyzer.ai_client.generate_text.return_value = json.dumps(char_data)
+        analyzer.ai_client.generate_text.return_value = json.dumps({"characters": char_data, "locations": []})
         
         chars = analyzer.extract_characters("text")
         
@@ -67,7 +94,7 @@ class TestStoryAnalyzer:
 
     def test_extract_locations(self, analyzer):
         loc_data = [{"name": "Park", "description": "Green trees", "original_name": "Park_Rus"}]
-        analyzer.ai_client.generate_text.return_value = json.dumps(loc_data)
+        analyzer.ai_client.generate_text.return_value = json.dumps({"characters": [], "locations": loc_data})
         
         locs = analyzer.extract_locations("text")
         
@@ -123,12 +150,12 @@ class TestStoryAnalyzer:
         assert len(scenes) == 1
 
     def test_extract_characters_json_fallback(self, analyzer):
-        analyzer.ai_client.generate_text.return_value = '```json\n[{"name": "Char", "description": "desc", "original_name": "Char"}]\n```'
+        analyzer.ai_client.generate_text.return_value = '```json\n{"characters": [{"name": "Char", "description": "desc", "original_name": "Char"}]}\n```'
         chars = analyzer.extract_characters("text")
         assert len(chars) == 1
 
     def test_extract_locations_json_fallback(self, analyzer):
-        analyzer.ai_client.generate_text.return_value = '```json\n[{"name": "Loc", "description": "desc", "original_name": "Loc"}]\n```'
+        analyzer.ai_client.generate_text.return_value = '```json\n{"locations": [{"name": "Loc", "description": "desc", "original_name": "Loc"}]}\n```'
         locs = analyzer.extract_locations("text")
         assert len(locs) == 1
 
@@ -137,6 +164,8 @@ class TestStoryAnalyzer:
         analyzer.ai_client.generate_text.return_value = [s1]
         scenes = analyzer.extract_scenes("text")
         assert len(scenes) == 1
+        # SDK-parsed scenes are used as-is instead of being dumped and re-validated
+        assert scenes[0] is s1
 
     def test_extract_scenes_non_list(self, analyzer):
         analyzer.ai_client.generate_text.return_value = '{"not": "list"}'
@@ -150,17 +179,95 @@ class TestStoryAnalyzer:
 
     def test_extract_scenes_chunk_summary(self, analyzer):
         text = "a" * 100
-        # Overlap = 0, size = 50 => splits to 2 chunks
-        analyzer.ai_client.generate_text.side_effect = ['```json\n[]\n```', Exception("Summary exception"), '```json\n[]\n```']
+        scene_prompts = []
+
+        def generate(contents, schema=None, system_instruction=None):
+            if schema is None:
+                raise Exception("Summary exception")
+            scene_prompts.append(contents[0])
+            return '```json\n[]\n```'
+
+        analyzer.ai_client.generate_text.side_effect = generate
         with patch.object(analyzer, 'simple_text_splitter', return_value=["Chunk1", "Chunk2"]):
             analyzer.extract_scenes(text)
 
-    def test_extract_characters_native_list(self, analyzer):
+        # The failed summary leaves the second chunk with the previous context
+        assert len(scene_prompts) == 2
+        assert all("Start of the story." in prompt for prompt in scene_prompts)
+
+    def test_extract_scenes_shares_static_instructions(self, analyzer):
+        analyzer.ai_client.generate_text.return_value = "[]"
+        with patch.object(analyzer, 'simple_text_splitter', return_value=["Chunk1", "Chunk2"]):
+            analyzer.extract_scenes("text")
+
+        scene_calls = [c for c in analyzer.ai_client.generate_text.call_args_list if c.kwargs.get("schema")]
+        instructions = {c.kwargs["system_instruction"] for c in scene_calls}
+        # Both chunks share one static prefix; only the user turn carries the summary
+        assert len(scene_calls) == 2 and len(instructions) == 1
+        assert "Start of the story." not in instructions.pop()
+
+    def test_extract_scenes_keeps_chunk_order_and_context(self, analyzer):
+        def scene(start, summary):
+            return Scene(id=0, start_index=start, end_index=start + 1, time_of_day="", location_name="",
+                         characters_present=[], action_description="", visual_description="",
+                         mood="", summary=summary, original_text_segment="")
+
+        def generate(contents, schema=None, system_instruction=None):
+            prompt, chunk = contents
+            if schema is None:
+                return f"summary of {chunk}"
+            # Scenes come back out of order within the chunk
+            return [scene(5, f"{chunk} second | {prompt}"), scene(0, f"{chunk} first | {prompt}")]
+
+        analyzer.ai_client.generate_text.side_effect = generate
+        with patch.object(analyzer, 'simple_text_splitter', return_value=["A", "B", "C"]):
+            scenes = analyzer.extract_scenes("text")
+
+        assert [s.id for s in scenes] == [1, 2, 3, 4, 5, 6]
+        assert [s.summary.split(" | ")[0] for s in scenes] == [
+            "A first", "A second", "B first", "B second", "C first", "C second"
+        ]
+        assert "Start of the story." in scenes[0].summary
+        assert "summary of A" in scenes[2].summary
+        assert "summary of B" in scenes[4].summary
+
+    def test_extract_characters_native_model(self, analyzer):
+        from app.core.models import SceneEntities
         c1 = Character(name="C", description="D")
-        analyzer.ai_client.generate_text.return_value = [c1]
-        assert len(analyzer.extract_characters("text")) == 1
+        analyzer.ai_client.generate_text.return_value = SceneEntities(characters=[c1])
+        assert analyzer.extract_characters("text") == [c1]
+        assert analyzer.ai_client.generate_text.call_args.kwargs["schema"] is SceneEntities
 
-    def test_extract_locations_native_list(self, analyzer):
+    def test_extract_locations_native_model(self, analyzer):
+        from app.core.models import SceneEntities
         l1 = Location(name="L", description="D")
-        analyzer.ai_client.generate_text.return_value = [l1]
-        assert len(analyzer.extract_locations("text")) == 1
+        analyzer.ai_client.generate_text.return_value = SceneEntities(locations=[l1])
+        assert analyzer.extract_locations("text") == [l1]
+
+    def test_extract_entities_single_request(self, analyzer):
+        from app.core.models import SceneEntities
+        entities = SceneEntities(
+            characters=[Character(name="Alice", description="Blonde girl")],
+            locations=[Location(name="Park", description="Green trees")],
+        )
+        analyzer.ai_client.generate_text.return_value = entities
+
+        chars, locs = analyzer.extract_entities("Alice walked in the park.")
+
+        analyzer.ai_client.generate_text.assert_called_once()
+        assert analyzer.ai_client.generate_text.call_args.kwargs["schema"] is SceneEntities
+        assert [c.name for c in chars] == ["Alice"]
+        assert [l.name for l in locs] == ["Park"]
+
+    def test_extract_entities_text_fallback(self, analyzer):
+        data = {"characters": [{"name": "Alice", "description": "D"}], "locations": []}
+        analyzer.ai_client.generate_text.return_value = f"```json\n{json.dumps(data)}\n```"
+
+        chars, locs = analyzer.extract_entities("text")
+
+        assert chars[0].name == "Alice"
+        assert locs == []
+
+    def test_extract_entities_failure(self, analyzer):
+        analyzer.ai_client.generate_text.return_value = "Not JSON"
+        assert analyzer.extract_entities("text") == ([], [])
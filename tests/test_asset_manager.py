@@ -157,6 +157,27 @@ class TestAssetManager:
         assert "New Guy" in asset_manager.characters
         asset_manager.ai_client.generate_image.assert_called_once()
 
+    def test_generate_character_assets_saves_once(self, asset_manager):
+        asset_manager.ai_client.translate_to_english.side_effect = lambda name: name
+        asset_manager.ai_client.generate_text.return_value = None
+        chars = [Character(name=f"Hero {i}", description="Desc") for i in range(3)]
+
+        with patch.object(asset_manager, "_save_data", wraps=asset_manager._save_data) as save:
+            asset_manager.generate_character_assets(chars, "style")
+
+        save.assert_called_once()
+        saved = json.loads(asset_manager.data_path.read_text(encoding="utf-8"))
+        assert [c["name"] for c in saved["characters"]] == ["Hero 0", "Hero 1", "Hero 2"]
+        assert not Path(f"{asset_manager.data_path}.tmp").exists()
+
+    def test_generate_assets_without_changes_does_not_save(self, asset_manager):
+        asset_manager.locations["Existing"] = Location(name="Existing", description="D")
+
+        with patch.object(asset_manager, "_save_data") as save:
+            asset_manager.generate_location_assets([Location(name="Existing", description="D")], "style")
+
+        save.assert_not_called()
+
     def test_generate_character_assets_failure(self, asset_manager):
         asset_manager.ai_client.translate_to_english.return_value = "Fail Guy"
         char = Character(name="Fail Guy", description="Desc")
@@ -270,6 +291,66 @@ class TestAssetManager:
         asset_manager.ai_client.generate_text.side_effect = Exception("Err")
         assert asset_manager._check_existing_character_semantic(char) is None
 
+    def test_generate_character_assets_batches_semantic_check(self, asset_manager):
+        from app.core.models import SemanticBatchResult, SemanticMatchItem
+        existing = Character(id=1, name="Hero", description="Tall knight", full_body_path="hero.jpg")
+        asset_manager.characters = {"Hero": existing}
+        asset_manager.ai_client.translate_to_english.side_effect = lambda name: name
+        asset_manager.ai_client.generate_text.return_value = SemanticBatchResult(matches=[
+            SemanticMatchItem(item_index=1, match_id=1),
+            SemanticMatchItem(item_index=2, match_id=None),
+        ])
+
+        alias = Character(name="The Knight", description="Tall knight")
+        newcomer = Character(name="Witch", description="Tall old woman")
+        asset_manager.generate_character_assets([alias, newcomer], "style")
+
+        asset_manager.ai_client.generate_text.assert_called_once()
+        assert alias.id == 1
+        assert alias.full_body_path == "hero.jpg"
+        assert newcomer.id == 2
+
+    def test_semantic_batch_links_new_items_within_one_call(self, asset_manager):
+        from app.core.models import SemanticBatchResult, SemanticMatchItem, SemanticMatchResult
+        asset_manager.characters = {"Hero": Character(id=1, name="Hero", description="Tall knight in a grey coat")}
+        asset_manager.ai_client.translate_to_english.side_effect = lambda name: name
+        asset_manager.ai_client.validate_image.return_value = MagicMock(is_valid=True)
+        asset_manager.ai_client.generate_text.side_effect = [
+            # The batch only compares against the catalog, where neither name has a match
+            SemanticBatchResult(matches=[
+                SemanticMatchItem(item_index=1, match_id=None),
+                SemanticMatchItem(item_index=2, match_id=None),
+            ]),
+            SemanticMatchResult(match_id=2, reason="same old man"),
+        ]
+
+        old_man = Character(name="Старик", description="Old man with a grey beard and a grey coat")
+        grandpa = Character(name="дед", description="Bearded old man in a worn grey coat")
+        asset_manager.generate_character_assets([old_man, grandpa], "style")
+
+        second_prompt = asset_manager.ai_client.generate_text.call_args_list[1][0][0]
+        assert "ID 2: Name='Старик'" in second_prompt
+        assert "ID 1:" not in second_prompt
+        assert (old_man.id, grandpa.id) == (2, 2)
+        assert asset_manager.characters["дед"] is old_man
+        assert asset_manager.ai_client.generate_image.call_count == 1
+
+    def test_semantic_batch_failure_falls_back_per_item(self, asset_manager):
+        from app.core.models import SemanticMatchResult
+        asset_manager.locations = {"Castle": Location(id=1, name="Castle", description="Stone keep")}
+        asset_manager.ai_client.generate_text.side_effect = [
+            Exception("Batch Err"),
+            SemanticMatchResult(match_id=1, reason="same keep"),
+            SemanticMatchResult(match_id=1, reason="same keep"),
+        ]
+
+        locs = [Location(name="Keep", description="Stone keep"), Location(name="Fortress", description="Stone keep")]
+        asset_manager.generate_location_assets(locs, "style")
+
+        assert asset_manager.ai_client.generate_text.call_count == 3
+        assert [loc.id for loc in locs] == [1, 1]
+        asset_manager.ai_client.generate_image.assert_not_called()
+
     def test_check_existing_location_semantic_no_locs(self, asset_manager):
         loc = Location(name="L", description="D")
         assert asset_manager._check_existing_location_semantic(loc) is None
@@ -287,7 +368,8 @@ class TestAssetManager:
         match = asset_manager._check_existing_location_semantic(loc)
         assert match.id == 2
         
-        # Match ID not found in dict
+        # Match ID not found in dict (forget the cached decision so the AI is asked again)
+        asset_manager._semantic_cache.clear()
         asset_manager.ai_client.generate_text.return_value = SemanticMatchResult(match_id=99, reason="x")
         match2 = asset_manager._check_existing_location_semantic(loc)
         assert match2 is None
@@ -320,3 +402,315 @@ class TestAssetManager:
         
         assert asset_manager.get_location_ref("ExactLoc") == "l.jpg"
         assert asset_manager.get_location_ref("NotExist") is None
+
+    def test_lookup_index_is_case_insensitive(self, asset_manager):
+        char = Character(name="Alice", description="D")
+        asset_manager.characters["Alice"] = char
+        asset_manager.locations = {"Old Mill": Location(name="Old Mill", description="D", reference_image_path="mill.jpg")}
+
+        assert asset_manager.get_character_data("alice") is char
+        assert asset_manager.get_location_ref("OLD MILL") == "mill.jpg"
+
+        del asset_manager.characters["Alice"]
+        assert asset_manager.get_character_data("alice") is None
+
+    def test_partial_name_lookup_uses_first_match_in_catalog_order(self, asset_manager):
+        mill = Location(name="Old Mill", description="D")
+        tower = Location(name="Tower", description="D")
+        asset_manager.locations = {"Old Mill": mill, "Mill": Location(name="Mill", description="D"), "Tower": tower}
+        asset_manager.locations["Ox"] = Location(name="Ox", description="D")
+
+        assert asset_manager.get_location_data("Old Mill by the river") is mill
+        assert asset_manager.get_location_data("ill") is mill
+        assert asset_manager.get_location_data("Oxford Tower") is tower
+        assert asset_manager.get_location_data("Ox") is asset_manager.locations["Ox"]
+        assert asset_manager.get_location_data("Swamp") is None
+
+        del asset_manager.locations["Old Mill"]
+        assert asset_manager.get_location_data("Old Mill by the river").name == "Mill"
+
+    def test_safe_name_is_sanitized_and_memoized(self, asset_manager):
+        asset_manager.ai_client.translate_to_english.return_value = "Sir Lancelot (the Brave)!"
+
+        assert asset_manager._safe_name("Ланселот") == "sir_lancelot_the_brave"
+        assert asset_manager._safe_name("Ланселот") == "sir_lancelot_the_brave"
+        asset_manager.ai_client.translate_to_english.assert_called_once_with("Ланселот")
+
+    def test_generate_location_assets_runs_concurrently(self, asset_manager):
+        import threading
+        asset_manager.ai_client.translate_to_english.side_effect = lambda name: name
+        asset_manager.ai_client.generate_text.return_value = None
+        asset_manager.ai_client.validate_image.return_value = MagicMock(is_valid=True)
+
+        barrier = threading.Barrier(2, timeout=5)
+        asset_manager.ai_client.generate_image.side_effect = lambda **kwargs: barrier.wait()
+
+        locs = [Location(name="Harbor", description="D"), Location(name="Desert", description="D")]
+        asset_manager.generate_location_assets(locs, "style")
+
+        # Both generations must have been in flight at the same time to pass the barrier
+        assert not barrier.broken
+        assert [loc.id for loc in locs] == [1, 2]
+        assert all(loc.reference_image_path for loc in locs)
+        assert list(asset_manager.locations) == ["Harbor", "Desert"]
+
+    def test_aliases_are_saved_once_and_restored(self, mock_wrapper_client, tmp_path):
+        output_dir = tmp_path / "output"
+        manager = AssetManager(mock_wrapper_client, output_dir)
+        char = Character(id=1, name="Robert", description="D", full_body_path="r.jpg")
+        manager.characters["Robert"] = char
+        manager.characters["Bob"] = char
+        manager._save_data()
+
+        data = json.loads((output_dir / "data.json").read_text(encoding="utf-8"))
+        assert [c["name"] for c in data["characters"]] == ["Robert"]
+        assert data["character_aliases"] == {"Bob": "Robert"}
+
+        reloaded = AssetManager(mock_wrapper_client, output_dir)
+        assert reloaded.characters["Bob"] is reloaded.characters["Robert"]
+        # Restored aliases are part of the case-insensitive and partial-name indexes
+        assert reloaded.get_character_data("bob") is reloaded.characters["Robert"]
+        assert reloaded.get_character_data("Uncle Bob") is reloaded.characters["Robert"]
+
+    def test_legacy_duplicate_ids_load_as_aliases(self, mock_wrapper_client, tmp_path):
+        output_dir = tmp_path / "output"
+        output_dir.mkdir()
+        (output_dir / "data.json").write_text(json.dumps({"characters": [
+            {"id": 1, "name": "Robert", "description": "D"},
+            {"id": 1, "name": "Bob", "description": "D"},
+        ]}), encoding="utf-8")
+
+        manager = AssetManager(mock_wrapper_client, output_dir)
+        assert manager.characters["Bob"] is manager.characters["Robert"]
+        assert manager.get_character_data("bob") is manager.characters["Robert"]
+        assert manager.get_character_data("Old Bob") is manager.characters["Robert"]
+
+    def test_save_keeps_other_fields_without_rereading(self, mock_wrapper_client, tmp_path):
+        output_dir = tmp_path / "output"
+        output_dir.mkdir()
+        (output_dir / "data.json").write_text(json.dumps({
+            "style_prompt": "noir",
+            "illustrations": [{"scene_id": 1}],
+            "characters": [{"id": 1, "name": "Hero", "description": "D"}],
+        }), encoding="utf-8")
+        manager = AssetManager(mock_wrapper_client, output_dir)
+
+        with patch("app.core.asset_manager.json_utils.load_file") as load_file:
+            manager._save_data()
+            load_file.assert_not_called()
+
+        data = json.loads((output_dir / "data.json").read_text(encoding="utf-8"))
+        assert data["style_prompt"] == "noir"
+        assert data["illustrations"] == [{"scene_id": 1}]
+        assert [c["name"] for c in data["characters"]] == ["Hero"]
+
+    def test_semantic_check_resolves_obvious_cases_locally(self, asset_manager):
+        hero = Character(id=1, name="Hero", description="Tall knight in silver armor")
+        asset_manager.characters = {"Hero": hero}
+
+        same = Character(name="The hero", description="Tall knight in silver armor")
+        unrelated = Character(name="Witch", description=(
+            "Face: hooked nose, sunken green eyes, warts. Hair: long tangled black strands. "
+            "Physique: hunched, bony. Outfit: ragged purple cloak, pointed hat, gnarled wooden staff."
+        ))
+        assert asset_manager._check_existing_character_semantic(same) is hero
+        assert asset_manager._check_existing_character_semantic(unrelated) is None
+        asset_manager.ai_client.generate_text.assert_not_called()
+
+    def test_semantic_check_asks_ai_unless_names_agree(self, asset_manager):
+        from app.core.models import SemanticMatchResult
+        asset_manager.characters = {
+            "Gate Guard": Character(id=1, name="Gate Guard", description="A tall guard in chain mail with a spear")
+        }
+        asset_manager.ai_client.generate_text.return_value = SemanticMatchResult(match_id=None, reason="different men")
+
+        # Same wording, different name: left to the AI instead of being merged
+        other = Character(name="Tower Guard", description="A tall guard in chain mail with a spear")
+        assert asset_manager._check_existing_character_semantic(other) is None
+        # Terse descriptions share too few words to rule out a match locally
+        alias = Character(name="Sentry", description="The watchman")
+        asset_manager._check_existing_character_semantic(alias)
+        assert asset_manager.ai_client.generate_text.call_count == 2
+
+    def test_semantic_check_sends_only_closest_candidates(self, asset_manager):
+        from app.core.models import SemanticMatchResult
+        asset_manager.locations = {
+            f"Place {i}": Location(id=i, name=f"Place {i}", description=f"Room number {i}") for i in range(1, 9)
+        }
+        asset_manager.locations["Kitchen"] = Location(id=9, name="Kitchen", description="Old stone kitchen")
+        asset_manager.ai_client.generate_text.return_value = SemanticMatchResult(match_id=9, reason="same")
+
+        loc = Location(name="Old Kitchen", description="Stone kitchen with a hearth")
+        assert asset_manager._check_existing_location_semantic(loc).id == 9
+
+        prompt = asset_manager.ai_client.generate_text.call_args[0][0]
+        assert prompt.count("- ID ") == 5
+        assert "ID 9:" in prompt
+
+    def test_semantic_batch_ignores_matches_outside_item_shortlist(self, asset_manager):
+        from app.core.models import SemanticBatchResult, SemanticMatchItem
+        asset_manager.locations = {
+            f"Place {i}": Location(id=i, name=f"Place {i}", description=f"Stone hearth room {i}") for i in range(1, 9)
+        }
+        asset_manager.locations["Kitchen"] = Location(id=9, name="Kitchen", description="Old stone kitchen")
+        asset_manager.locations["Tower"] = Location(id=10, name="Tower", description="Tall tower by the sea shore")
+        kitchen = Location(name="Old Kitchen", description="Stone kitchen with a hearth")
+        tower = Location(name="High Tower", description="Tall tower by the sea")
+
+        # The model picks the tower for the kitchen, although it was only shortlisted for the other item
+        asset_manager.ai_client.generate_text.return_value = SemanticBatchResult(matches=[
+            SemanticMatchItem(item_index=1, match_id=10),
+            SemanticMatchItem(item_index=2, match_id=10),
+        ])
+        result = asset_manager._check_existing_semantic_batch([kitchen, tower], asset_manager.locations, "location")
+
+        assert "Candidate IDs:" in asset_manager.ai_client.generate_text.call_args[0][0]
+        assert result == {"High Tower": asset_manager.locations["Tower"]}
+
+        # Replay: only the in-shortlist decision was cached, the kitchen is not turned into a new entity
+        asset_manager.ai_client.generate_text.return_value = SemanticBatchResult(matches=[])
+        replay = asset_manager._check_existing_semantic_batch([kitchen, tower], asset_manager.locations, "location")
+        assert replay == {"High Tower": asset_manager.locations["Tower"]}
+
+    def test_asset_failures_are_skipped_regardless_of_batch_size(self, asset_manager):
+        calls = []
+
+        def failing():
+            calls.append("fail")
+            raise RuntimeError("boom")
+
+        asset_manager._run_concurrently([failing])
+        asset_manager._run_concurrently([failing, lambda: calls.append("ok")])
+        assert sorted(calls) == ["fail", "fail", "ok"]
+
+    def test_generate_character_assets_lists_directory_once(self, asset_manager):
+        asset_manager.ai_client.translate_to_english.side_effect = lambda name: name
+        asset_manager.ai_client.generate_text.return_value = None
+        asset_manager.char_dir.mkdir(parents=True, exist_ok=True)
+        (asset_manager.char_dir / "1_anna.jpeg").touch()
+        (asset_manager.char_dir / "2_boris.jpeg").touch()
+
+        chars = [Character(name="Anna", description="D"), Character(name="Boris", description="E")]
+        with patch.object(Path, "exists", side_effect=AssertionError("unexpected stat")):
+            asset_manager.generate_character_assets(chars, "style")
+
+        asset_manager.ai_client.generate_image.assert_not_called()
+        assert [c.full_body_path for c in chars] == [
+            str(asset_manager.char_dir / "1_anna.jpeg"), str(asset_manager.char_dir / "2_boris.jpeg")
+        ]
+
+    def test_semantic_decisions_persist_across_runs(self, mock_wrapper_client, tmp_path):
+        from app.core.models import SemanticMatchResult
+        output_dir = tmp_path / "output"
+        manager = AssetManager(mock_wrapper_client, output_dir)
+        manager.characters = {"Hero": Character(id=1, name="Hero", description="Tall knight")}
+        mock_wrapper_client.generate_text.return_value = SemanticMatchResult(match_id=1, reason="same")
+
+        knight = Character(name="The Knight", description="Tall knight")
+        assert manager._check_existing_character_semantic(knight).id == 1
+        manager.flush()
+
+        reloaded = AssetManager(mock_wrapper_client, output_dir)
+        assert reloaded._check_existing_character_semantic(knight) is reloaded.characters["Hero"]
+        mock_wrapper_client.generate_text.assert_called_once()
+
+    def test_name_translation_runs_in_generation_workers(self, asset_manager):
+        import threading
+        barrier = threading.Barrier(2, timeout=5)
+
+        def translate(name):
+            barrier.wait()
+            return name
+
+        asset_manager.ai_client.translate_to_english.side_effect = translate
+        asset_manager.ai_client.generate_text.return_value = None
+        asset_manager.ai_client.validate_image.return_value = MagicMock(is_valid=True)
+
+        chars = [Character(name="Anna", description="D"), Character(name="Boris", description="E")]
+        asset_manager.generate_character_assets(chars, "style")
+
+        # Both translations must have been in flight at the same time to pass the barrier
+        assert not barrier.broken
+        assert [c.full_body_path for c in chars] == [
+            str(asset_manager.char_dir / "1_anna.jpeg"), str(asset_manager.char_dir / "2_boris.jpeg")
+        ]
+
+    def test_generated_card_is_reused_from_image_cache(self, asset_manager, tmp_path):
+        def write_image(prompt, reference_images, output_path, aspect_ratio):
+            Path(output_path).write_bytes(b"image")
+
+        asset_manager.ai_client.generate_image.side_effect = write_image
+        asset_manager.ai_client.validate_image.return_value = MagicMock(is_valid=True)
+
+        first = tmp_path / "1_hero.jpeg"
+        assert asset_manager._generate_single_card(Character(name="Hero", description="D"), "style", first)
+        assert asset_manager.ai_client.generate_image.call_count == 1
+
+        # Same prompt under another ID/filename: copied from the cache instead of generated
+        second = tmp_path / "2_hero.jpeg"
+        char = Character(name="Hero", description="D")
+        assert asset_manager._generate_single_card(char, "style", second)
+        assert asset_manager.ai_client.generate_image.call_count == 1
+        assert second.read_bytes() == b"image"
+        assert char.full_body_path == str(second)
+
+        # A different description is a cache miss
+        asset_manager._generate_single_card(Character(name="Hero", description="Other"), "style", tmp_path / "3_hero.jpeg")
+        assert asset_manager.ai_client.generate_image.call_count == 2
+
+    def test_image_cache_restores_the_prompt_that_produced_the_image(self, asset_manager, tmp_path, monkeypatch):
+        from app.config import Config
+        monkeypatch.setattr(Config, "MAX_RETRIES", 3)
+
+        def write_image(prompt, reference_images, output_path, aspect_ratio):
+            Path(output_path).write_bytes(b"image")
+
+        asset_manager.ai_client.generate_image.side_effect = write_image
+        asset_manager.ai_client.validate_image.side_effect = [
+            MagicMock(is_valid=False, feedback="two heads"), MagicMock(is_valid=True)
+        ]
+        asset_manager.ai_client.sanitize_prompt_feedback.return_value = "Draw exactly one head"
+
+        first = Character(name="Hero", description="D")
+        assert asset_manager._generate_single_card(first, "style", tmp_path / "1_hero.jpeg")
+        assert "[CRITICAL CORRECTIONS REQUIRED]" in first.generation_prompt
+
+        restored = Character(name="Hero", description="D")
+        assert asset_manager._generate_single_card(restored, "style", tmp_path / "2_hero.jpeg")
+        assert asset_manager.ai_client.generate_image.call_count == 2
+        assert restored.generation_prompt == first.generation_prompt
+
+    def test_name_index_setdefault_and_copy_keep_indexes(self):
+        from app.core.asset_manager import _NameIndex
+        wizard = Character(name="The Great Wizard", description="D")
+        index = _NameIndex()
+
+        assert index.setdefault("The Great Wizard", wizard) is wizard
+        assert index.setdefault("The Great Wizard", None) is wizard
+        assert index.find("the great wizard") is wizard
+        assert index.find("Great Wizard") is wizard
+
+        copied = index.copy()
+        assert isinstance(copied, _NameIndex)
+        assert copied.find("Great Wizard") is wizard
+
+    def test_catalog_keys_are_interned(self, asset_manager):
+        import sys
+        name = "".join(["Ali", "ce"])
+        asset_manager.characters[name] = Character(name=name, description="D")
+        assert next(iter(asset_manager.characters)) is sys.intern("Alice")
+
+    def test_fully_catalogued_batch_is_a_pure_lookup(self, asset_manager):
+        asset_manager.characters = {"Hero": Character(id=4, name="Hero", description="D", full_body_path="hero.jpg")}
+        asset_manager.locations = {"Old Mill": Location(id=2, name="Old Mill", description="D", reference_image_path="mill.jpg")}
+
+        char = Character(name="Hero", description="D")
+        loc = Location(name="old mill", description="D")
+        with patch.object(asset_manager, "_save_data") as save:
+            asset_manager.generate_character_assets([char], "style")
+            asset_manager.generate_location_assets([loc], "style")
+            save.assert_not_called()
+
+        assert (char.id, char.full_body_path, char.reference_image_path) == (4, "hero.jpg", "hero.jpg")
+        assert (loc.id, loc.reference_image_path) == (2, "mill.jpg")
+        asset_manager.ai_client.generate_text.assert_not_called()
@@ -16,7 +16,8 @@ def test_analyze_scene_for_highlight_success(mock_genai_client):
     # Setup mock response
     expected_response = {
         "highlight_description": "The hero draws their sword.",
-        "image_prompt": "A close up of a shining sword being drawn from a scabbard."
+        "image_prompt": "A close up of a shining sword being drawn from a scabbard.",
+        "active_characters": []
     }
     
     mock_response = MagicMock()
@@ -37,7 +38,8 @@ def test_analyze_scene_for_highlight_success(mock_genai_client):
     call_args = mock_genai_client.client.models.generate_content.call_args
     assert call_args is not None
     prompt_sent = call_args.kwargs['contents']
-    assert "Analyze the following scene text" in prompt_sent
+    assert "Analyze the following scene text" in call_args.kwargs['config'].system_instruction
+    assert "Analyze the following scene text" not in prompt_sent
     assert scene_text in prompt_sent
 
 def test_analyze_scene_for_highlight_json_cleanup(mock_genai_client):
@@ -117,6 +119,52 @@ def test_analyze_scene_for_highlight_hallucination_filtering(mock_genai_client):
     assert "Alice" in result["active_characters"]
     assert "Gandalf" not in result["active_characters"]
 
+def test_analyze_scene_for_highlight_missing_keys_falls_back(mock_genai_client):
+    # Response that does not satisfy the HighlightResult schema
+    mock_response = MagicMock()
+    mock_response.text = json.dumps({"highlight_description": "desc"})
+    mock_response.parsed = None
+    mock_genai_client.client.models.generate_content.return_value = mock_response
+
+    result = mock_genai_client.analyze_scene_for_highlight("scene text", ["Alice"])
+
+    assert result["image_prompt"] == "scene text"
+    assert "Fallback" in result["highlight_description"]
+
+def test_analyze_scene_for_highlight_repairs_invalid_response(mock_genai_client):
+    invalid = '{"highlight_description": "desc"}'
+    valid = '{"highlight_description": "desc", "image_prompt": "prompt", "active_characters": ["Alice"]}'
+
+    with patch.object(mock_genai_client, 'generate_text', side_effect=[invalid, valid]) as gen:
+        result = mock_genai_client.analyze_scene_for_highlight("scene text", ["Alice"])
+
+    assert result["image_prompt"] == "prompt"
+    assert gen.call_count == 2
+    repair_prompt = gen.call_args_list[1].args[0]
+    assert "Previous response failed validation" in repair_prompt
+    assert "image_prompt" in repair_prompt
+
+def test_analyze_scene_for_highlight_repair_exhausted(mock_genai_client):
+    with patch.object(mock_genai_client, 'generate_text', return_value="Not JSON") as gen:
+        result = mock_genai_client.analyze_scene_for_highlight("scene text")
+
+    # One initial attempt plus the repair retries
+    assert gen.call_count == 3
+    assert result["image_prompt"] == "scene text"
+
+def test_analyze_scene_for_highlight_requests_schema(mock_genai_client):
+    from app.core.models import HighlightResult
+    mock_response = MagicMock()
+    mock_response.parsed = HighlightResult(highlight_description="d", image_prompt="p")
+    mock_genai_client.client.models.generate_content.return_value = mock_response
+
+    result = mock_genai_client.analyze_scene_for_highlight("text")
+
+    assert result == {"highlight_description": "d", "image_prompt": "p", "active_characters": []}
+    config = mock_genai_client.client.models.generate_content.call_args.kwargs['config']
+    assert config.response_mime_type == 'application/json'
+    assert config.response_schema is HighlightResult
+
 def test_analyze_scene_for_highlight_empty_active_chars(mock_genai_client):
     expected_response = {
         "highlight_description": "desc",
@@ -143,3 +191,69 @@ def test_analyze_scene_for_highlight_native_schema(mock_genai_client):
         result = mock_genai_client.analyze_scene_for_highlight("text", ["Alice", "Bob"])
         assert "Alice" in result["active_characters"]
         assert "Gandalf" not in result["active_characters"]
+
+def _make_batch_job(state, inlined_responses=None):
+    job = MagicMock()
+    job.name = "batches/123"
+    job.state.name = state
+    job.dest.inlined_responses = inlined_responses or []
+    return job
+
+def test_analyze_scenes_batch_maps_results_by_index(mock_genai_client):
+    ok_item = MagicMock()
+    ok_item.error = None
+    ok_item.response.text = json.dumps({
+        "highlight_description": "desc",
+        "image_prompt": "prompt",
+        "active_characters": ["Alice", "Gandalf"]
+    })
+    failed_item = MagicMock()
+    failed_item.error.message = "Blocked"
+
+    batches = mock_genai_client.client.batches
+    batches.create.return_value = _make_batch_job("JOB_STATE_SUCCEEDED", [ok_item, failed_item])
+
+    results = mock_genai_client.analyze_scenes_batch([("scene one", ["Alice"]), ("scene two", ["Bob"])])
+
+    assert len(results) == 2
+    assert results[0]["image_prompt"] == "prompt"
+    assert results[0]["active_characters"] == ["Alice"]
+    # Per-item failure keeps the single-scene fallback
+    assert results[1]["image_prompt"] == "scene two"
+    assert results[1]["active_characters"] == ["Bob"]
+
+    kwargs = batches.create.call_args.kwargs
+    assert len(kwargs['src']) == 2
+    assert "scene one" in kwargs['src'][0].contents
+    assert kwargs['src'][0].config.system_instruction == kwargs['src'][1].config.system_instruction
+
+def test_analyze_scenes_batch_polls_until_done(mock_genai_client):
+    item = MagicMock()
+    item.error = None
+    item.response.text = '{"highlight_description": "d", "image_prompt": "p", "active_characters": []}'
+
+    batches = mock_genai_client.client.batches
+    batches.create.return_value = _make_batch_job("JOB_STATE_PENDING")
+    batches.get.side_effect = [
+        _make_batch_job("JOB_STATE_RUNNING"),
+        _make_batch_job("JOB_STATE_SUCCEEDED", [item])
+    ]
+
+    with patch('app.core.ai_client.time.sleep'):
+        results = mock_genai_client.analyze_scenes_batch([("text", [])])
+
+    assert batches.get.call_count == 2
+    assert results[0]["image_prompt"] == "p"
+
+def test_analyze_scenes_batch_job_failure_falls_back(mock_genai_client):
+    mock_genai_client.client.batches.create.side_effect = Exception("Batch API Error")
+
+    with patch.object(mock_genai_client, 'analyze_scene_for_highlight', return_value={"image_prompt": "single"}) as single:
+        results = mock_genai_client.analyze_scenes_batch([("a", []), ("b", [])])
+
+    assert single.call_count == 2
+    assert results == [{"image_prompt": "single"}, {"image_prompt": "single"}]
+
+def test_analyze_scenes_batch_empty(mock_genai_client):
+    assert mock_genai_client.analyze_scenes_batch([]) == []
+    mock_genai_client.client.batches.create.assert_not_called()
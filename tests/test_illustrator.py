@@ -41,7 +41,7 @@ class TestStoryIllustrator:
         illustrator.ai_client.analyze_scene_for_highlight.return_value = {"image_prompt": "highlight prompt", "active_characters": ["Alice"]}
         
         # Test execute
-        with patch("builtins.open", mock_open()) as mocked_file:
+        with patch("builtins.open", mock_open()) as mocked_file, patch("app.utils.json_utils.os.replace"):
              illustrator.illustrate_scenes([scene], "style")
 
         # Verify Scene Folder Creation - UPDATED: No folder, direct file
@@ -72,6 +72,32 @@ class TestStoryIllustrator:
         assert kwargs['reference_images'][1]['path'] == "loc_ref.jpg"
         assert kwargs['reference_images'][1]['purpose'] == "Environment Reference for Park"
 
+    def test_illustrate_scenes_batch_highlights(self, illustrator, monkeypatch):
+        from app.config import Config
+        monkeypatch.setattr(Config, "HIGHLIGHT_BATCH_MODE", True)
+        scenes = [
+            Scene(id=i, start_index=0, end_index=0, time_of_day="", location_name="Park", characters_present=["Alice"], action_description="", visual_description="test", mood="", summary="", original_text_segment=f"Text {i}")
+            for i in (1, 2)
+        ]
+
+        illustrator.ai_client.generate_filename_slug.return_value = "slug"
+        illustrator.asset_manager.get_character_data.return_value = None
+        illustrator.asset_manager.get_location_data.return_value = None
+        illustrator.asset_manager.get_location_ref.return_value = None
+        illustrator.asset_manager.characters = {}
+        illustrator.ai_client.analyze_scenes_batch.return_value = [
+            {"image_prompt": "batched prompt", "active_characters": []}
+        ] * 2
+
+        illustrator.illustrate_scenes(scenes, "style")
+
+        illustrator.ai_client.analyze_scenes_batch.assert_called_once()
+        batch_arg = illustrator.ai_client.analyze_scenes_batch.call_args.args[0]
+        assert batch_arg == [("Text 1", ["Alice"]), ("Text 2", ["Alice"])]
+        illustrator.ai_client.analyze_scene_for_highlight.assert_not_called()
+        assert illustrator.ai_client.generate_image.call_count == 2
+        assert "batched prompt" in illustrator.ai_client.generate_image.call_args.kwargs['prompt']
+
     def test_select_character_ref_portrait(self, illustrator):
         scene = Scene(
             id=1, start_index=0, end_index=0, time_of_day="", location_name="", 
@@ -187,3 +213,114 @@ class TestStoryIllustrator:
         
         manifest = illustrator.output_dir.parent / "data.json"
         assert manifest.exists()
+
+    def test_save_data_json_keeps_fields_it_does_not_own(self, illustrator):
+        import json
+        manifest = illustrator.output_dir.parent / "data.json"
+        manifest.write_text(json.dumps({"semantic_cache": {"k": 1}, "illustrations": [{"scene_id": 9}]}), encoding="utf-8")
+        illustrator.asset_manager.characters = {}
+
+        illustrator._save_data_json("style")
+
+        data = json.loads(manifest.read_text(encoding="utf-8"))
+        assert data["semantic_cache"] == {"k": 1}
+        assert data["illustrations"] == []
+        assert data["style_prompt"] == "style"
+
+    def test_prepare_scene_records_path_relative_to_output_root(self, illustrator):
+        import os
+        scene = Scene(id=3, start_index=0, end_index=0, time_of_day="", location_name="Park", characters_present=[], action_description="", visual_description="v", mood="", summary="", original_text_segment="")
+        illustrator.ai_client.generate_filename_slug.return_value = "slug"
+
+        _, img_file, metadata = illustrator._prepare_scene(scene)
+
+        assert metadata["illustration_path"] == os.path.join("illustrations", "3_slug.jpeg")
+        assert metadata["illustration_path"] == str(img_file.relative_to(illustrator.output_dir.parent))
+
+    def test_illustrate_scenes_lists_directory_once(self, illustrator):
+        scenes = [
+            Scene(id=i, start_index=0, end_index=0, time_of_day="", location_name="Park", characters_present=[], action_description="", visual_description="v", mood="", summary="", original_text_segment="")
+            for i in (1, 2)
+        ]
+        illustrator.ai_client.generate_filename_slug.return_value = "slug"
+        illustrator.asset_manager.get_location_data.return_value = None
+        illustrator.asset_manager.characters = {}
+        for scene in scenes:
+            (illustrator.output_dir / f"{scene.id}_slug.jpeg").touch()
+
+        with patch.object(Path, "exists", side_effect=lambda: False) as exists:
+            illustrator.illustrate_scenes(scenes, "style")
+
+        # Only the manifest check stats the filesystem; both scenes were skipped via the listing
+        assert exists.call_count == 1
+        illustrator.ai_client.generate_image.assert_not_called()
+
+    def test_save_data_json_keeps_prompts_of_skipped_scenes(self, illustrator):
+        import json
+        manifest = illustrator.output_dir.parent / "data.json"
+        manifest.write_text(json.dumps({"illustrations": [
+            {"scene_id": 1, "illustration_path": "illustrations/1_a.jpeg", "generation_prompt": "old prompt"},
+            {"scene_id": 2, "illustration_path": "illustrations/2_b.jpeg", "generation_prompt": "stale"},
+        ]}), encoding="utf-8")
+        illustrator.asset_manager.characters = {}
+        illustrator.illustrations_registry = [
+            {"scene_id": 2, "illustration_path": "illustrations/2_b.jpeg", "generation_prompt": "new prompt"},
+            {"scene_id": 1, "illustration_path": "illustrations/1_a.jpeg", "generation_prompt": None},
+            {"scene_id": 3, "illustration_path": "illustrations/3_c.jpeg", "generation_prompt": None},
+        ]
+
+        illustrator._save_data_json("style")
+
+        data = json.loads(manifest.read_text(encoding="utf-8"))
+        assert [e["generation_prompt"] for e in data["illustrations"]] == ["old prompt", "new prompt", None]
+
+    def test_save_data_json_skips_unchanged_manifest(self, illustrator):
+        illustrator.asset_manager.characters = {"Alice": Character(name="Alice", description="D", id=1)}
+        illustrator.asset_manager.locations = {}
+        illustrator.illustrations_registry = [
+            {"scene_id": 1, "illustration_path": "illustrations/1_a.jpeg", "generation_prompt": "prompt"},
+        ]
+        illustrator._save_data_json("style")
+
+        with patch("app.core.illustrator.json_utils.dump_file") as dump_file:
+            illustrator._save_data_json("style")
+            dump_file.assert_not_called()
+            illustrator._save_data_json("new style")
+            dump_file.assert_called_once()
+
+    @pytest.mark.parametrize("content", ["[1, 2]", "null", '{"illustrations": 5}'])
+    def test_save_data_json_tolerates_malformed_manifest(self, illustrator, content):
+        import json
+        manifest = illustrator.output_dir.parent / "data.json"
+        manifest.write_text(content, encoding="utf-8")
+        illustrator.asset_manager.characters = {}
+        illustrator.asset_manager.locations = {}
+        illustrator.illustrations_registry = [
+            {"scene_id": 1, "illustration_path": "illustrations/1_a.jpeg", "generation_prompt": None},
+        ]
+
+        illustrator._save_data_json("style")
+
+        data = json.loads(manifest.read_text(encoding="utf-8"))
+        assert data["style_prompt"] == "style"
+        assert data["illustrations"][0]["generation_prompt"] is None
+
+    def test_catalog_lookups_are_memoized_per_run(self, illustrator):
+        scenes = [
+            Scene(id=i, start_index=0, end_index=0, time_of_day="", location_name="Park", characters_present=["Alice"], action_description="", visual_description="v", mood="", summary="", original_text_segment="")
+            for i in (1, 2, 3)
+        ]
+        illustrator.ai_client.generate_filename_slug.side_effect = lambda text: "slug"
+        illustrator.ai_client.analyze_scene_for_highlight.return_value = {}
+        illustrator.ai_client.validate_image.return_value = MagicMock(is_valid=True)
+        illustrator.asset_manager.get_character_data.return_value = Character(id=1, name="Alice", description="D", full_body_path="a.jpg")
+        illustrator.asset_manager.get_location_data.return_value = Location(id=1, name="Park", description="D")
+        illustrator.asset_manager.get_location_ref.return_value = "park.jpg"
+        illustrator.asset_manager.characters = {}
+
+        illustrator.illustrate_scenes(scenes, "style")
+
+        assert illustrator.ai_client.generate_image.call_count == 3
+        illustrator.asset_manager.get_character_data.assert_called_once_with("Alice")
+        illustrator.asset_manager.get_location_data.assert_called_once_with("Park")
+        illustrator.asset_manager.get_location_ref.assert_called_once_with("Park")
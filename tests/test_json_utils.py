@@ -0,0 +1,48 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.utils import json_utils
+
+
+def test_loads_with_stdlib(monkeypatch):
+    monkeypatch.setattr(json_utils, "orjson", None)
+    assert json_utils.loads('{"name": "Алиса", "ids": [1, 2]}') == {"name": "Алиса", "ids": [1, 2]}
+
+
+def test_loads_prefers_orjson(monkeypatch):
+    fake_orjson = MagicMock()
+    fake_orjson.loads.return_value = {"fast": True}
+    monkeypatch.setattr(json_utils, "orjson", fake_orjson)
+
+    assert json_utils.loads('{"fast": true}') == {"fast": True}
+    fake_orjson.loads.assert_called_once_with('{"fast": true}')
+
+
+def test_strip_code_fences():
+    assert json_utils.strip_code_fences('```json\n{"a": 1}\n```') == '{"a": 1}'
+    assert json_utils.strip_code_fences('```\n[]\n```  ') == '[]'
+    assert json_utils.strip_code_fences('{"a": 1}') == '{"a": 1}'
+
+
+def test_dump_and_load_file_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(json_utils, "orjson", None)
+    path = tmp_path / "data.json"
+    data = {"characters": [{"name": "Колобок", "id": 1}]}
+
+    json_utils.dump_file(data, path)
+
+    assert "Колобок" in path.read_text(encoding="utf-8")
+    assert json_utils.load_file(path) == data
+
+
+def test_dump_file_layout_does_not_depend_on_orjson(tmp_path, monkeypatch):
+    orjson = pytest.importorskip("orjson")
+    data = {"style_prompt": "noir", "characters": [{"name": "Колобок", "id": 1, "tags": [], "extra": {}}], "n": None}
+
+    monkeypatch.setattr(json_utils, "orjson", orjson)
+    json_utils.dump_file(data, tmp_path / "fast.json")
+    monkeypatch.setattr(json_utils, "orjson", None)
+    json_utils.dump_file(data, tmp_path / "stdlib.json")
+
+    assert (tmp_path / "fast.json").read_bytes() == (tmp_path / "stdlib.json").read_bytes()
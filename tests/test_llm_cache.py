@@ -0,0 +1,118 @@
+
+import json
+import pytest
+from unittest.mock import patch
+from app.core.ai_client import GenAIClient
+from app.core.llm_cache import LLMCache
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LLMCache(tmp_path / "cache" / ".llm_cache.db")
+    yield cache
+    cache.close()
+
+class TestLLMCache:
+    def test_set_and_get(self, cache):
+        key = LLMCache.make_key("translate", "model", "Колобок")
+        assert cache.get(key) is None
+
+        cache.set(key, "Kolobok")
+        assert cache.get(key) == "Kolobok"
+
+    def test_persists_across_instances(self, tmp_path):
+        path = tmp_path / ".llm_cache.db"
+        first = LLMCache(path)
+        first.set("k", {"image_prompt": "p", "active_characters": ["A"]})
+        first.close()
+
+        second = LLMCache(path)
+        assert second.get("k") == {"image_prompt": "p", "active_characters": ["A"]}
+        second.close()
+
+    def test_make_key_is_stable(self):
+        assert LLMCache.make_key("a", 1, ["x"]) == LLMCache.make_key("a", 1, ["x"])
+        assert LLMCache.make_key("a", 1) != LLMCache.make_key("a", 2)
+
+    def test_client_translate_uses_cache(self, mock_genai_client, cache):
+        client = GenAIClient(cache=cache)
+        with patch.object(client, 'generate_text', return_value="Little Bun") as gen:
+            assert client.translate_to_english("Колобок") == "Little_Bun"
+            assert client.translate_to_english("Колобок") == "Little_Bun"
+            assert gen.call_count == 1
+
+    def test_client_does_not_cache_failures(self, mock_genai_client, cache):
+        client = GenAIClient(cache=cache)
+        with patch.object(client, 'generate_text', side_effect=Exception("API")):
+            assert client.generate_filename_slug("desc") == "scene"
+        with patch.object(client, 'generate_text', return_value="Bun Escapes") as gen:
+            assert client.generate_filename_slug("desc") == "bunescapes"
+            assert client.generate_filename_slug("desc") == "bunescapes"
+            assert gen.call_count == 1
+
+    def test_client_highlight_uses_cache(self, mock_genai_client, cache):
+        client = GenAIClient(cache=cache)
+        response = '{"highlight_description": "d", "image_prompt": "p", "active_characters": ["A"]}'
+        with patch.object(client, 'generate_text', return_value=response) as gen:
+            first = client.analyze_scene_for_highlight("text", ["B", "A"])
+            second = client.analyze_scene_for_highlight("text", ["A", "B"])
+            assert first == second
+            assert gen.call_count == 1
+
+    def test_client_batch_skips_cached_scenes(self, mock_genai_client, cache):
+        client = GenAIClient(cache=cache)
+        cache.set(client._cache_key("highlight", "cached", []), {"image_prompt": "from cache"})
+        client.client.batches.create.side_effect = Exception("Batch API Error")
+
+        with patch.object(client, 'analyze_scene_for_highlight', return_value={"image_prompt": "fresh"}) as single:
+            results = client.analyze_scenes_batch([("cached", []), ("new", [])])
+
+        assert results == [{"image_prompt": "from cache"}, {"image_prompt": "fresh"}]
+        single.assert_called_once_with("new", [])
+
+    def test_analyzer_entities_use_cache(self, mock_genai_client, cache):
+        from app.core.analyzer import StoryAnalyzer
+        from app.core.models import Character, Location, SceneEntities
+        client = GenAIClient(cache=cache)
+        analyzer = StoryAnalyzer(client)
+        entities = SceneEntities(
+            characters=[Character(name="Bun", description="Round", original_name="Колобок")],
+            locations=[Location(name="Forest", description="Dark")],
+        )
+        with patch.object(client, 'generate_text', return_value=entities) as gen:
+            first = analyzer.extract_entities("text")
+            second = analyzer.extract_entities("text")
+            assert gen.call_count == 1
+        assert second == first
+        assert isinstance(second[0][0], Character) and second[0][0].original_name == "Колобок"
+
+    def test_analyzer_scene_failures_are_not_cached(self, mock_genai_client, cache):
+        from app.core.analyzer import StoryAnalyzer
+        client = GenAIClient(cache=cache)
+        analyzer = StoryAnalyzer(client)
+        scene = {
+            "id": 0, "start_index": 0, "end_index": 4, "time_of_day": "Day", "location_name": "Forest",
+            "characters_present": ["Bun"], "action_description": "Rolling", "visual_description": "v",
+            "mood": "m", "summary": "s", "original_text_segment": "Once"
+        }
+        with patch.object(client, 'generate_text', return_value="Not JSON"):
+            assert analyzer.extract_scenes("Once") == []
+        with patch.object(client, 'generate_text', return_value=json.dumps([scene])) as gen:
+            assert analyzer.extract_scenes("Once")[0].location_name == "Forest"
+            assert analyzer.extract_scenes("Once")[0].id == 1
+            assert gen.call_count == 1
+
+    @pytest.mark.parametrize("empty", [None, "", "  "])
+    def test_analyzer_empty_responses_are_not_cached(self, mock_genai_client, cache, empty):
+        from app.core.analyzer import StoryAnalyzer
+        from app.core.models import Character, SceneEntities
+        client = GenAIClient(cache=cache)
+        analyzer = StoryAnalyzer(client)
+        entities = SceneEntities(characters=[Character(name="Bun", description="Round")])
+
+        with patch.object(client, 'generate_text', return_value=empty):
+            assert analyzer.extract_entities("text") == ([], [])
+            assert analyzer.extract_scenes("Once") == []
+        with patch.object(client, 'generate_text', return_value=entities) as gen:
+            chars, _ = analyzer.extract_entities("text")
+            assert [c.name for c in chars] == ["Bun"]
+            assert gen.call_count == 1
@@ -47,10 +47,8 @@ def test_main_sync_logic(tmp_path):
         # The analyzer should return English translation Character/Location models
         extracted_char_1 = Character(name="The Old Man", description="x", original_name="Старик")
         extracted_char_2 = Character(name="The Old Woman", description="y", original_name="Старуха")
-        mock_analyzer_instance.extract_characters.return_value = [extracted_char_1, extracted_char_2]
-        
         extracted_loc = Location(name="Old Couple's Hut", description="z", original_name="Изба")
-        mock_analyzer_instance.extract_locations.return_value = [extracted_loc]
+        mock_analyzer_instance.extract_entities.return_value = ([extracted_char_1, extracted_char_2], [extracted_loc])
         
         mock_story_analyzer.return_value = mock_analyzer_instance
         
@@ -62,3 +60,39 @@ def test_main_sync_logic(tmp_path):
         # Verify that the scene attributes were synchronized!
         assert initial_scene.characters_present == ["The Old Man", "The Old Woman"]
         assert initial_scene.location_name == "Old Couple's Hut"
+
+def test_main_illustrates_all_scenes_once(tmp_path):
+    """
+    Tests that main.py renders every scene in a single illustrate_scenes call
+    once all assets are prepared, so scenes are generated concurrently.
+    """
+    runner = CliRunner()
+
+    text_file = tmp_path / "story.txt"
+    text_file.write_text("Dummy story text", encoding='utf-8')
+
+    with patch('main.Config.validate'), \
+         patch('main.GenAIClient'), \
+         patch('main.StoryAnalyzer') as mock_story_analyzer, \
+         patch('main.AssetManager'), \
+         patch('main.StoryIllustrator') as mock_illustrator:
+
+        scenes = [
+            Scene(
+                id=i, start_index=0, end_index=10, time_of_day="Day", location_name="Hut",
+                characters_present=[], action_description="Action", visual_description="Vis",
+                mood="Mood", summary="Sum", original_text_segment=f"Segment {i}"
+            )
+            for i in (1, 2, 3)
+        ]
+
+        mock_analyzer_instance = MagicMock()
+        mock_analyzer_instance.extract_style.return_value = "Style"
+        mock_analyzer_instance.extract_scenes.return_value = scenes
+        mock_analyzer_instance.extract_entities.return_value = ([], [])
+        mock_story_analyzer.return_value = mock_analyzer_instance
+
+        result = runner.invoke(main.main, ['--text-file', str(text_file), '--output-dir', str(tmp_path / "output")])
+
+        assert result.exit_code == 0
+        mock_illustrator.return_value.illustrate_scenes.assert_called_once_with(scenes, "Style")
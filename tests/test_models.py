@@ -51,3 +51,13 @@ class TestModels:
     def test_scene_validation(self):
         with pytest.raises(ValueError):
             Scene(id="not-an-int") # id should be int
+
+    def test_from_record(self):
+        char = Character.from_record({"id": 3, "original_name": "Hero", "description": "D", "full_body_path": "f.jpg", "unknown": 1})
+        assert (char.id, char.name, char.full_body_path) == (3, "Hero", "f.jpg")
+
+        loc = Location.from_record({"name": "Forest", "description": "D", "original_name": "The Forest"})
+        assert (loc.name, loc.original_name) == ("Forest", "The Forest")
+
+        with pytest.raises(ValueError):
+            Character.from_record({"name": "Hero"})
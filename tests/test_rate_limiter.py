@@ -0,0 +1,30 @@
+from unittest.mock import patch
+
+from app.utils.rate_limiter import RateLimiter
+
+
+def test_disabled_limiter_never_waits():
+    limiter = RateLimiter(0)
+    with patch("app.utils.rate_limiter.time.sleep") as sleep:
+        for _ in range(10):
+            limiter.acquire()
+    sleep.assert_not_called()
+
+
+def test_burst_then_waits_for_refill():
+    clock = [100.0]
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    with patch("app.utils.rate_limiter.time.monotonic", side_effect=lambda: clock[0]), \
+            patch("app.utils.rate_limiter.time.sleep", side_effect=fake_sleep):
+        limiter = RateLimiter(60, burst=2)  # one request per second
+        limiter.acquire()
+        limiter.acquire()
+        assert sleeps == []
+
+        limiter.acquire()
+        assert sleeps == [1.0]